@@ -0,0 +1,649 @@
+import os
+import re
+import sys
+import gzip
+import json
+import time
+import array
+import signal
+import socket
+import argparse
+import resource
+import threading
+import subprocess
+import http.server
+import multiprocessing
+from typing import Any
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_syslog_header import CORPUS_FORMATS, build_corpus  # noqa: E402
+
+
+BENCH_MARKER_PATTERN = re.compile(rb' bench_seq=(\d+) bench_ts=(\d+)')
+BLAST_TICK_INTERVAL = 0.01
+DEFAULT_CORPUS_SIZE = 10000
+DEFAULT_HEC_PORT = 18088
+DEFAULT_SYSLOG_PORT = 15514
+
+
+def percentile(
+    values: list[float],
+    p: float,
+) -> float | None:
+    """Get a percentile of sorted values.
+
+    :param values: The values sorted.
+    :param p: The percentile (0 to 100).
+    :return: The value at the percentile, or None if there are no values.
+    """
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+class MockHec:
+    """ Mock of the Cortex HTTP Event Collector (/logs/v1/event)
+
+    Logs are decompressed and counted by line. The markers appended by SyslogBlaster
+    are used to detect lost and duplicated logs and to measure the end-to-end latency.
+    """
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        latency: float = 0,
+        error_rate: float = 0,
+        error_code: int = 503,
+    ) -> None:
+        """Initialize this instance.
+
+        :param host: The address to listen on.
+        :param port: The port number to listen on.
+        :param latency: The delay in seconds before responding to each request.
+        :param error_rate: The ratio (0 to 1) of requests to fail.
+        :param error_code: The HTTP status code of the failed requests.
+        """
+        self.__lock = threading.Lock()
+        self.__requests = 0
+        self.__errors = 0
+        self.__bytes = 0
+        self.__lines = 0
+        self.__unique = 0
+        self.__duplicates = 0
+        self.__seen = bytearray()
+        self.__latencies = array.array('d')
+        self.__first_time = None
+        self.__last_time = None
+        self.__latency = latency
+        self.__error_rate = error_rate
+        self.__error_code = error_code
+
+        receive = self.__receive
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(
+                self
+            ) -> None:
+                code = receive(
+                    self.rfile.read(int(self.headers.get('Content-Length') or 0)),
+                    self.headers.get('Content-Encoding') == 'gzip'
+                )
+                body = b'{}'
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(
+                self,
+                format: str,
+                *args: Any,
+            ) -> None:
+                pass
+
+        self.__server = http.server.ThreadingHTTPServer((host, port), Handler)
+        self.__server.daemon_threads = True
+        self.__thread = threading.Thread(
+            target=self.__server.serve_forever,
+            args=(),
+            daemon=True
+        )
+
+    def __receive(
+        self,
+        data: bytes,
+        gzipped: bool,
+    ) -> int:
+        """Count a request.
+
+        :param data: The request body.
+        :param gzipped: True if the body is compressed by Content-Encoding.
+        :return: The HTTP status code to respond with.
+        """
+        if self.__latency:
+            time.sleep(self.__latency)
+
+        with self.__lock:
+            # Spread errors evenly rather than randomly to be reproducible
+            n = self.__requests
+            self.__requests += 1
+            if self.__error_rate and int(n * self.__error_rate) != int((n + 1) * self.__error_rate):
+                self.__errors += 1
+                return self.__error_code
+
+        now = time.time_ns()
+        if gzipped or data[:2] == b'\x1f\x8b':
+            data = gzip.decompress(data)
+
+        with self.__lock:
+            self.__bytes += len(data)
+            self.__lines += data.count(b'\n')
+            if self.__first_time is None:
+                self.__first_time = now
+            self.__last_time = now
+
+            seen = self.__seen
+            for m in BENCH_MARKER_PATTERN.finditer(data):
+                seq = int(m[1])
+                if seq >= len(seen):
+                    seen.extend(bytes(max(seq + 1, len(seen) * 2) - len(seen)))
+                if seen[seq]:
+                    self.__duplicates += 1
+                else:
+                    seen[seq] = 1
+                    self.__unique += 1
+                    self.__latencies.append((now - int(m[2])) / 1e9)
+        return 200
+
+    @property
+    def statistics(
+        self
+    ) -> dict[str, Any]:
+        """The statistics of the logs received.
+        """
+        with self.__lock:
+            latencies = sorted(self.__latencies)
+            elapsed = ((self.__last_time or 0) - (self.__first_time or 0)) / 1e9
+            return {
+                'requests': self.__requests,
+                'errors': self.__errors,
+                'bytes': self.__bytes,
+                'lines': self.__lines,
+                'unique': self.__unique,
+                'duplicates': self.__duplicates,
+                'first_time': (self.__first_time or 0) / 1e9,
+                'last_time': (self.__last_time or 0) / 1e9,
+                'eps': self.__unique / elapsed if elapsed > 0 else 0,
+                'latency_p50': percentile(latencies, 50),
+                'latency_p99': percentile(latencies, 99),
+                'latency_max': latencies[-1] if latencies else None,
+            }
+
+    def start(
+        self
+    ) -> None:
+        """Start the server in the background.
+        """
+        self.__thread.start()
+
+    def stop(
+        self
+    ) -> None:
+        """Stop the server.
+        """
+        self.__server.shutdown()
+        self.__server.server_close()
+
+
+class SyslogBlaster:
+    """ Syslog load generator replaying a corpus at a target rate
+    """
+    def __init__(
+        self,
+        protocol: str,
+        host: str,
+        port: int,
+        corpus: list[str],
+        connections: int = 1,
+        framing: str = 'non-transparent',
+    ) -> None:
+        """Initialize this instance.
+
+        :param protocol: The protocol: 'udp' or 'tcp'.
+        :param host: The host to send messages to.
+        :param port: The port number to send messages to.
+        :param corpus: The messages to be replayed.
+        :param connections: The number of TCP connections (or UDP sockets) to send messages in turn.
+        :param framing: The TCP framing: 'non-transparent' or 'octet-counting'.
+        """
+        self.__protocol = protocol
+        self.__address = (host, port)
+        self.__corpus = corpus
+        self.__framing = framing
+        self.__sent = 0
+        self.__sent_bytes = 0
+        self.__errors = 0
+        self.__sockets = []
+        for _ in range(max(1, connections)):
+            if protocol == 'udp':
+                sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                sock.connect(self.__address)
+            else:
+                sock = socket.create_connection(self.__address)
+            self.__sockets.append(sock)
+
+    @property
+    def sent(
+        self
+    ) -> int:
+        """The number of messages sent.
+        """
+        return self.__sent
+
+    def __send(
+        self,
+        n: int,
+    ) -> None:
+        """Send messages.
+
+        :param n: The number of messages to send.
+        """
+        corpus = self.__corpus
+        ts = time.time_ns()
+        seq = self.__sent
+        messages = [
+            f'{corpus[i % len(corpus)]} bench_seq={i} bench_ts={ts}'.encode()
+            for i in range(seq, seq + n)
+        ]
+        sockets = self.__sockets
+        if self.__protocol == 'udp':
+            for i, msg in enumerate(messages):
+                try:
+                    sockets[i % len(sockets)].send(msg)
+                    self.__sent_bytes += len(msg)
+                except OSError:
+                    # The receiver is not ready or the buffer is full
+                    self.__errors += 1
+        else:
+            if self.__framing == 'octet-counting':
+                messages = [b'%d %s' % (len(msg), msg) for msg in messages]
+            else:
+                messages = [msg + b'\n' for msg in messages]
+            for i, sock in enumerate(sockets):
+                data = b''.join(messages[i::len(sockets)])
+                sock.sendall(data)
+                self.__sent_bytes += len(data)
+        self.__sent = seq + n
+
+    def run(
+        self,
+        eps: int,
+        duration: float,
+    ) -> dict[str, Any]:
+        """Send messages at a target rate.
+
+        :param eps: The target number of messages per second, or 0 to send as fast as possible.
+        :param duration: The number of seconds to send messages.
+        :return: The statistics.
+        """
+        start = time.monotonic()
+        end = start + duration
+        while (now := time.monotonic()) < end:
+            if eps > 0:
+                n = int((now - start) * eps) - self.__sent
+                if n > 0:
+                    self.__send(n)
+                time.sleep(BLAST_TICK_INTERVAL)
+            else:
+                self.__send(1000)
+
+        elapsed = time.monotonic() - start
+        return {
+            'sent': self.__sent,
+            'sent_bytes': self.__sent_bytes,
+            'send_errors': self.__errors,
+            'duration': elapsed,
+            'eps': self.__sent / elapsed if elapsed > 0 else 0,
+        }
+
+    def close(
+        self
+    ) -> None:
+        """Close the connections.
+        """
+        for sock in self.__sockets:
+            sock.close()
+
+
+def run_mock_hec(
+    port: int,
+    latency: float,
+    error_rate: float,
+    error_code: int,
+    conn: Any,
+) -> None:
+    """Run the mock HEC in a process until requested to stop.
+
+    :param port: The port number to listen on.
+    :param latency: The delay in seconds before responding to each request.
+    :param error_rate: The ratio (0 to 1) of requests to fail.
+    :param error_code: The HTTP status code of the failed requests.
+    :param conn: The pipe to receive the requests ('stats' or 'stop') and send the statistics.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    mock = MockHec('127.0.0.1', port, latency, error_rate, error_code)
+    mock.start()
+    conn.send('ready')
+    while conn.recv() != 'stop':
+        conn.send(mock.statistics)
+    conn.send(mock.statistics)
+    mock.stop()
+
+
+class BenchmarkRunner:
+    """ Runner of syslog_to_hec.py against the mock HEC and the syslog blaster
+    """
+    def __init__(
+        self,
+        args: argparse.Namespace,
+    ) -> None:
+        """Initialize this instance.
+
+        :param args: The command line arguments.
+        """
+        self.__args = args
+
+    def __receive(
+        self,
+        conn: Any,
+        mock: multiprocessing.Process,
+        timeout: float,
+    ) -> Any:
+        """Receive a message from the mock HEC.
+
+        :param conn: The pipe connected to the mock HEC.
+        :param mock: The mock HEC process.
+        :param timeout: The seconds to wait for the message.
+        :return: The message.
+        """
+        deadline = time.monotonic() + timeout
+        while not conn.poll(0.1):
+            if not mock.is_alive():
+                raise RuntimeError(f'The mock HEC exited with {mock.exitcode}.')
+            if time.monotonic() >= deadline:
+                raise RuntimeError('The mock HEC did not respond.')
+        return conn.recv()
+
+    def __request_stats(
+        self,
+        conn: Any,
+        mock: multiprocessing.Process,
+        req: str = 'stats',
+    ) -> dict[str, Any]:
+        conn.send(req)
+        return self.__receive(conn, mock, self.__args.drain_timeout)
+
+    def __wait_for_port(
+        self,
+        proc: subprocess.Popen,
+    ) -> None:
+        """Wait for the forwarder to start listening.
+
+        :param proc: The forwarder process.
+        """
+        args = self.__args
+        deadline = time.monotonic() + args.startup_timeout
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError(f'The forwarder exited with {proc.returncode}.')
+            if args.protocol == 'tcp':
+                try:
+                    socket.create_connection(('127.0.0.1', args.syslog_port), timeout=1).close()
+                    return
+                except OSError:
+                    pass
+            else:
+                # There is no handshake in UDP. Check if the port is bound instead.
+                with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                    try:
+                        sock.bind(('127.0.0.1', args.syslog_port))
+                    except OSError:
+                        return
+            time.sleep(0.1)
+        raise RuntimeError('The forwarder did not start listening.')
+
+    def run(
+        self
+    ) -> dict[str, Any]:
+        """Run a benchmark.
+
+        :return: The results.
+        """
+        args = self.__args
+        parent_conn, child_conn = multiprocessing.Pipe()
+        mock = multiprocessing.Process(
+            target=run_mock_hec,
+            args=(args.hec_port, args.hec_latency, args.hec_error_rate, args.hec_error_code, child_conn),
+            daemon=True
+        )
+        mock.start()
+        try:
+            self.__receive(parent_conn, mock, args.startup_timeout)
+        except RuntimeError:
+            mock.terminate()
+            mock.join()
+            raise
+
+        cmd = [
+            sys.executable,
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), 'syslog_to_hec.py'),
+            '--syslog_protocol', args.protocol,
+            '--syslog_port', str(args.syslog_port),
+            '--hec_api_url', f'http://127.0.0.1:{args.hec_port}',
+            '--hec_api_key_raw', 'bench',
+            '--hec_api_key_cef', 'bench',
+            *args.forwarder_args,
+        ]
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        proc = subprocess.Popen(
+            cmd,
+            stdout=None if args.verbose else subprocess.DEVNULL,
+            stderr=None if args.verbose else subprocess.DEVNULL
+        )
+        try:
+            self.__wait_for_port(proc)
+
+            blaster = SyslogBlaster(
+                args.protocol,
+                '127.0.0.1',
+                args.syslog_port,
+                build_corpus(args.corpus_size, formats=tuple(args.formats)),
+                args.connections,
+                args.framing
+            )
+            try:
+                blast = blaster.run(args.eps, args.duration)
+            finally:
+                blaster.close()
+
+            # Wait for the forwarder to deliver the logs until no progress is made
+            last = -1
+            deadline = time.monotonic() + args.drain_timeout
+            while time.monotonic() < deadline:
+                stats = self.__request_stats(parent_conn, mock)
+                if stats['unique'] >= blast['sent'] or stats['unique'] == last:
+                    break
+                last = stats['unique']
+                time.sleep(args.drain_interval)
+        finally:
+            proc.send_signal(signal.SIGINT)
+            try:
+                proc.wait(timeout=args.drain_timeout)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+
+        # The CPU time of the forwarder including its worker processes
+        cpu = (
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_utime - usage.ru_utime +
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_stime - usage.ru_stime
+        )
+        hec = self.__request_stats(parent_conn, mock, 'stop')
+        mock.join()
+
+        elapsed = hec['last_time'] - hec['first_time']
+        return {
+            'protocol': args.protocol,
+            'formats': args.formats,
+            'target_eps': args.eps,
+            'forwarder_args': args.forwarder_args,
+            'sent': blast['sent'],
+            'sent_eps': blast['eps'],
+            'delivered': hec['unique'],
+            'duplicates': hec['duplicates'],
+            'lost': blast['sent'] - hec['unique'],
+            'loss_rate': (blast['sent'] - hec['unique']) / blast['sent'] if blast['sent'] else 0,
+            'sustained_eps': hec['unique'] / max(elapsed, blast['duration']) if hec['unique'] else 0,
+            'latency_p50': hec['latency_p50'],
+            'latency_p99': hec['latency_p99'],
+            'cpu_seconds': cpu,
+            'cpu_us_per_message': cpu * 1e6 / hec['unique'] if hec['unique'] else None,
+            'hec_requests': hec['requests'],
+            'hec_errors': hec['errors'],
+        }
+
+
+def print_results(
+    results: dict[str, Any],
+    baseline: dict[str, Any] | None = None,
+) -> None:
+    """Print the results of a benchmark.
+
+    :param results: The results.
+    :param baseline: The results to compare with, or None.
+    """
+    for name, fmt in (
+        ('sent', '{:,}'),
+        ('sent_eps', '{:,.0f}'),
+        ('delivered', '{:,}'),
+        ('duplicates', '{:,}'),
+        ('lost', '{:,}'),
+        ('loss_rate', '{:.4%}'),
+        ('sustained_eps', '{:,.0f}'),
+        ('latency_p50', '{:.3f}s'),
+        ('latency_p99', '{:.3f}s'),
+        ('cpu_seconds', '{:.2f}'),
+        ('cpu_us_per_message', '{:.1f}'),
+        ('hec_requests', '{:,}'),
+        ('hec_errors', '{:,}'),
+    ):
+        value = results.get(name)
+        line = f'{name:<20} {"-" if value is None else fmt.format(value):>14}'
+        if baseline and isinstance(value, (int, float)) and isinstance(base := baseline.get(name), (int, float)):
+            line += f'   baseline {fmt.format(base):>14}'
+            if base:
+                line += f' ({(value - base) / base:+.1%})'
+        print(line)
+
+
+def main(
+) -> None:
+    """
+    Main
+    """
+    ap = argparse.ArgumentParser(description='Offline benchmark suite for syslog_to_hec.py and Syslog_To_HEC.yml')
+    sub = ap.add_subparsers(dest='command', required=True)
+
+    def add_hec_arguments(
+        p: argparse.ArgumentParser
+    ) -> None:
+        p.add_argument('--hec_port', type=int, default=DEFAULT_HEC_PORT, help=f'The port number of the mock HEC. The default is {DEFAULT_HEC_PORT}.')
+        p.add_argument('--hec_latency', type=float, default=0, help='The delay in seconds before the mock HEC responds to each request.')
+        p.add_argument('--hec_error_rate', type=float, default=0, help='The ratio (0 to 1) of requests for the mock HEC to fail.')
+        p.add_argument('--hec_error_code', type=int, default=503, help='The HTTP status code of the failed requests. The default is 503.')
+
+    def add_blast_arguments(
+        p: argparse.ArgumentParser
+    ) -> None:
+        p.add_argument('--protocol', choices=['udp', 'tcp'], default='udp', help='The syslog protocol. The default is "udp".')
+        p.add_argument('--syslog_port', type=int, default=DEFAULT_SYSLOG_PORT, help=f'The syslog port number. The default is {DEFAULT_SYSLOG_PORT}.')
+        p.add_argument('--formats', nargs='+', choices=CORPUS_FORMATS, default=list(CORPUS_FORMATS), help='The formats of the messages.')
+        p.add_argument('--corpus_size', type=int, default=DEFAULT_CORPUS_SIZE, help=f'The number of distinct messages. The default is {DEFAULT_CORPUS_SIZE}.')
+        p.add_argument('--eps', type=int, default=10000, help='The target messages per second, or 0 for no limit. The default is 10000.')
+        p.add_argument('--duration', type=float, default=10, help='The number of seconds to send messages. The default is 10.')
+        p.add_argument('--connections', type=int, default=1, help='The number of TCP connections or UDP sockets. The default is 1.')
+        p.add_argument('--framing', choices=['non-transparent', 'octet-counting'], default='non-transparent', help='The TCP framing.')
+
+    p = sub.add_parser('mock-hec', help='Run the mock HEC until interrupted.')
+    add_hec_arguments(p)
+    p.add_argument(
+        '--hec_host',
+        default='127.0.0.1',
+        help='The address for the mock HEC to listen on. Set "" to accept the logs from Syslog_To_HEC.yml running on an engine.'
+    )
+    p.add_argument('--stats_interval', type=float, default=10, help='The interval in seconds to print the statistics.')
+
+    p = sub.add_parser('blast', help='Send syslog messages to a forwarder.')
+    add_blast_arguments(p)
+    p.add_argument('--host', default='127.0.0.1', help='The host to send messages to.')
+
+    p = sub.add_parser('run', help='Run syslog_to_hec.py against the mock HEC and the blaster, and report the results.')
+    add_hec_arguments(p)
+    add_blast_arguments(p)
+    p.add_argument('--startup_timeout', type=float, default=30, help='The seconds to wait for the mock HEC and the forwarder to start.')
+    p.add_argument('--drain_timeout', type=float, default=60, help='The seconds to wait for the forwarder to deliver the logs.')
+    p.add_argument('--drain_interval', type=float, default=3, help='The seconds without progress to stop waiting for the logs.')
+    p.add_argument('--output', help='The file to save the results as JSON.')
+    p.add_argument('--baseline', help='The results file of a previous run to compare with.')
+    p.add_argument('--verbose', action='store_true', help='Show the output of the forwarder.')
+    p.add_argument('forwarder_args', nargs=argparse.REMAINDER, help='The options passed to syslog_to_hec.py after "--".')
+
+    args = ap.parse_args()
+    if args.command == 'mock-hec':
+        mock = MockHec(args.hec_host, args.hec_port, args.hec_latency, args.hec_error_rate, args.hec_error_code)
+        mock.start()
+        print(f'The mock HEC is listening on http://{args.hec_host or "0.0.0.0"}:{args.hec_port}/logs/v1/event')
+        try:
+            while True:
+                time.sleep(args.stats_interval)
+                print(json.dumps(mock.statistics))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            mock.stop()
+            print(json.dumps(mock.statistics))
+
+    elif args.command == 'blast':
+        blaster = SyslogBlaster(
+            args.protocol,
+            args.host,
+            args.syslog_port,
+            build_corpus(args.corpus_size, formats=tuple(args.formats)),
+            args.connections,
+            args.framing
+        )
+        try:
+            print(json.dumps(blaster.run(args.eps, args.duration)))
+        finally:
+            blaster.close()
+
+    else:
+        if args.forwarder_args[:1] == ['--']:
+            args.forwarder_args = args.forwarder_args[1:]
+
+        results = BenchmarkRunner(args).run()
+        baseline = None
+        if args.baseline:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        print_results(results, baseline)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+import os
+import sys
+import time
+import random
+import argparse
+import datetime
+from typing import Any, Callable
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from syslog_to_hec import SyslogHeaderParser, SyslogTimestampCache  # noqa: E402
+
+
+CORPUS_FORMATS = ('rfc3164', 'rfc5424', 'cef')
+
+
+def build_corpus(
+    n: int,
+    seed: int = 0,
+    formats: tuple[str, ...] | None = None,
+) -> list[str]:
+    """Build a corpus of realistic syslog messages.
+
+    :param n: The number of messages.
+    :param seed: The random seed.
+    :param formats: The formats of the messages in CORPUS_FORMATS, or None for the default mix.
+    :return: The messages.
+    """
+    rnd = random.Random(seed)
+
+    def ip() -> str:
+        return '.'.join(str(rnd.randint(1, 254)) for _ in range(4))
+
+    def cef_3164() -> str:
+        return (
+            f'<14>Oct {rnd.randint(1, 31):2d} 22:14:{rnd.randint(0, 59):02d} fw{rnd.randint(1, 9):02d}'
+            ' CEF:0|Palo Alto Networks|PAN-OS|10.1.6|end|TRAFFIC|1|rt=Oct 11 2024 22:14:15 GMT'
+            f' deviceExternalId=0123456789 src={ip()} dst={ip()} spt={rnd.randint(1024, 65535)}'
+            f' dpt=443 proto=tcp act=allow cs1Label=Rule cs1=allow-web suser=acme\\\\user{rnd.randint(1, 99)}'
+            ' cs4Label=FromZone cs4=trust cs5Label=ToZone cs5=untrust in=1234 out=5678'
+        )
+
+    def panos_3164() -> str:
+        return (
+            f'<14>Oct {rnd.randint(1, 31):2d} 22:14:{rnd.randint(0, 59):02d} PA-5220'
+            f' 1,2024/10/11 22:14:15,012345678901,TRAFFIC,end,2561,2024/10/11 22:14:15,{ip()},{ip()},'
+            f'0.0.0.0,0.0.0.0,allow-web,,,ssl,vsys1,trust,untrust,ethernet1/1,ethernet1/2,Forward,'
+            f'2024/10/11 22:14:15,{rnd.randint(1, 999999)},1,{rnd.randint(1024, 65535)},443,0,0,0x400019,'
+            'tcp,allow,5325,1247,4078,22,2024/10/11 22:13:58,16,computer-and-internet-info,0,'
+            '7300587390,0x0,10.0.0.0-10.255.255.255,United States,0,12,10,tcp-fin'
+        )
+
+    def cef_5424() -> str:
+        return (
+            f'<134>1 2024-10-11T22:14:{rnd.randint(0, 59):02d}.{rnd.randint(0, 999):03d}Z gw{rnd.randint(1, 9)}'
+            ' CEF - - - CEF:0|Check Point|VPN-1 & FireWall-1|Check Point|Log|Accept|Unknown|'
+            f'act=Accept src={ip()} dst={ip()} spt={rnd.randint(1024, 65535)} dpt=53 proto=17'
+        )
+
+    def app_3164() -> str:
+        return (
+            f'<38>Oct {rnd.randint(1, 31):2d} 22:14:{rnd.randint(0, 59):02d} web01'
+            f' sshd[{rnd.randint(100, 99999)}]: Accepted publickey for admin from {ip()} port 52214 ssh2'
+        )
+
+    def app_5424() -> str:
+        return (
+            f'<165>1 2024-10-11T22:14:{rnd.randint(0, 59):02d}.{rnd.randint(0, 999999):06d}+09:00 app{rnd.randint(1, 9)}.example.com'
+            f' evntslog {rnd.randint(100, 99999)} ID47 [exampleSDID@32473 iut="3" eventSource="Application" eventID="1011"]'
+            f' User login succeeded from {ip()}'
+        )
+
+    if formats is None:
+        generators = (cef_3164, panos_3164, cef_5424, app_3164)
+    else:
+        generators = tuple(
+            g for fmt in formats for g in {
+                'rfc3164': (panos_3164, app_3164),
+                'rfc5424': (app_5424,),
+                'cef': (cef_3164, cef_5424),
+            }[fmt]
+        )
+    return [rnd.choice(generators)() for _ in range(n)]
+
+
+def bench(
+    parsers: dict[str, Callable[[str], Any]],
+    corpus: list[str],
+    rounds: int,
+) -> dict[str, float]:
+    """Measure the parse rates.
+
+    The parsers are run in turn for each round, and the best round is taken
+    to reduce the noise from other processes.
+
+    :param parsers: The parser functions by name.
+    :param corpus: The messages to parse.
+    :param rounds: The number of times to parse the corpus.
+    :return: The number of messages parsed per second by name.
+    """
+    best = {name: float('inf') for name in parsers}
+    for _ in range(rounds):
+        for name, parse in parsers.items():
+            t = time.perf_counter()
+            for log in corpus:
+                parse(log)
+            best[name] = min(best[name], time.perf_counter() - t)
+
+    rates = {name: len(corpus) / elapsed for name, elapsed in best.items()}
+    for name, rate in rates.items():
+        print(f'{name:<28} {rate:>12,.0f} msgs/s')
+    return rates
+
+
+def main(
+) -> None:
+    """
+    Main
+    """
+    ap = argparse.ArgumentParser(description='Benchmark of the syslog header parser in syslog_to_hec.py')
+    ap.add_argument('--messages', type=int, default=20000, help='The number of messages in the corpus.')
+    ap.add_argument('--rounds', type=int, default=10, help='The number of times to parse the corpus with each parser.')
+    args = ap.parse_args()
+
+    corpus = build_corpus(args.messages)
+    for log in corpus:
+        if SyslogHeaderParser.parse(log) != SyslogHeaderParser.parse_by_regex(log):
+            raise RuntimeError(f'The fast path differs from the regex - {log}')
+
+    rates = bench(
+        {
+            'regex (reference)': SyslogHeaderParser.parse_by_regex,
+            'fast path': SyslogHeaderParser.parse,
+        },
+        corpus,
+        args.rounds
+    )
+    print(f'speedup: {rates["fast path"] / rates["regex (reference)"]:.2f}x')
+
+    cache = SyslogTimestampCache('%Y-%m-%dT%H:%M:%SZ')
+    rates = bench(
+        {
+            'timestamp (strftime)': lambda _: datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'timestamp (cached)': lambda _: cache.now(),
+        },
+        corpus,
+        args.rounds
+    )
+    print(f'speedup: {rates["timestamp (cached)"] / rates["timestamp (strftime)"]:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
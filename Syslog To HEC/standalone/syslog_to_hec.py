@@ -5,19 +5,29 @@ import sys
 import time
 import json
 import gzip
+import queue
+import struct
 import socket
+import signal
+import asyncio
+import collections
 import select
 import getpass
+import bisect
 import argparse
-import datetime
 import requests
 import functools
 import threading
 import traceback
 import threading
+import multiprocessing
+import http.server
 import urllib.parse
+from typing import Any, Callable, Iterator, NamedTuple
 from asyncio import IncompleteReadError
 from socketserver import BaseServer, BaseRequestHandler, ThreadingTCPServer, ThreadingUDPServer
+from requests.auth import HTTPBasicAuth
+from requests.packages.urllib3.util.retry import Retry
 from requests.packages.urllib3.exceptions import InsecureRequestWarning
 requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
 
@@ -25,6 +35,40 @@ requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
 DEFAULT_SOCKET_TIMEOUT = 30
 DEFAULT_LOG_FLUSH_INTERVAL = 10
 HEC_UPLOAD_SIZE_THRESHOLD = 1 * 1024 * 1024
+DEFAULT_HEC_UPLOAD_WORKERS = 2
+DEFAULT_HEC_UPLOAD_QUEUE_SIZE = 8
+DEFAULT_HTTP_POOL_SIZE = 4
+DEFAULT_HTTP_RETRIES = 3
+DEFAULT_HTTP_RETRY_BACKOFF = 0.5
+HTTP_RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+DEFAULT_TCP_RECV_BUFFER_SIZE = 256 * 1024
+SYSLOG_MAX_MESSAGE_SIZE = 1 * 1024 * 1024
+DEFAULT_SPOOL_MAX_SIZE = 1 * 1024 * 1024 * 1024
+DEFAULT_SPOOL_MAX_MEMORY = 64 * 1024 * 1024
+DEFAULT_SPOOL_SEGMENT_SIZE = 64 * 1024 * 1024
+DEFAULT_SPOOL_RETRY_INTERVAL = 1
+DEFAULT_SPOOL_MAX_RETRY_INTERVAL = 60
+METRICS_MAX_SOURCES = 1024
+METRICS_COUNT_INTERVAL = 1000
+METRICS_REPORT_INTERVAL = 5
+METRICS_BATCH_LOGS_BUCKETS = (10, 100, 1000, 5000, 10000, 50000, 100000)
+METRICS_BATCH_BYTES_BUCKETS = (1024, 16 * 1024, 128 * 1024, 512 * 1024, 1024 * 1024, 2 * 1024 * 1024, 8 * 1024 * 1024)
+METRICS_LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+DEFAULT_UDP_RECV_BUFFER_SIZE = 16 * 1024 * 1024
+DEFAULT_UDP_RECV_BATCH_SIZE = 256
+DEFAULT_STATS_INTERVAL = 60
+# The statistics that are current levels or ages, not counters, to be combined across the workers by max
+STATS_GAUGES = frozenset((
+    'queue_depth',
+    'queued_bytes',
+    'inflight_batches',
+    'spool_bytes',
+    'spool_segments',
+    'spool_oldest_age',
+    'replay_rate',
+))
+UDP_MAX_DATAGRAM_SIZE = 65535
+SO_RXQ_OVFL = getattr(socket, 'SO_RXQ_OVFL', 40 if sys.platform.startswith('linux') else None)
 
 
 class Settings:
@@ -77,6 +121,37 @@ class Settings:
             default=514,
             help='The port number to receive syslog messages. The default is port 514.'
         )
+        ap.add_argument(
+            '--engine',
+            type=str,
+            choices=['thread', 'asyncio'],
+            default='thread',
+            help=(
+                'The engine to receive syslog messages. "thread" starts a thread for each UDP datagram or TCP connection, '
+                '"asyncio" reads UDP datagrams in batches on an event loop (TCP always uses "thread"). The default is "thread".'
+            )
+        )
+        ap.add_argument(
+            '--udp_recv_buffer_size',
+            type=int,
+            default=DEFAULT_UDP_RECV_BUFFER_SIZE,
+            help=f'The socket receive buffer size (SO_RCVBUF) in bytes for the asyncio engine. The default is {DEFAULT_UDP_RECV_BUFFER_SIZE}.'
+        )
+        ap.add_argument(
+            '--udp_recv_batch_size',
+            type=int,
+            default=DEFAULT_UDP_RECV_BATCH_SIZE,
+            help=f'The maximum number of UDP datagrams to read at once in the asyncio engine. The default is {DEFAULT_UDP_RECV_BATCH_SIZE}.'
+        )
+        ap.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help=(
+                'The number of worker processes. Each worker binds the syslog port with SO_REUSEPORT '
+                'and has its own HEC senders. The default is 1 (no worker processes).'
+            )
+        )
         ap.add_argument(
             '--hec_api_url',
             type=str,
@@ -100,6 +175,64 @@ class Settings:
             action='store_true',
             help='Enables compression for HEC messages.'
         )
+        ap.add_argument(
+            '--hec_upload_workers',
+            type=int,
+            default=DEFAULT_HEC_UPLOAD_WORKERS,
+            help=f'The number of threads uploading batches to HEC in parallel. The default is {DEFAULT_HEC_UPLOAD_WORKERS}.'
+        )
+        ap.add_argument(
+            '--hec_upload_queue_size',
+            type=int,
+            default=DEFAULT_HEC_UPLOAD_QUEUE_SIZE,
+            help=f'The maximum number of batches waiting to be uploaded to HEC. The default is {DEFAULT_HEC_UPLOAD_QUEUE_SIZE}.'
+        )
+        ap.add_argument(
+            '--hec_backpressure',
+            type=str,
+            choices=['block', 'drop'],
+            default='block',
+            help=(
+                'The behavior when the HEC upload queue is full. "block" makes receivers wait for room, '
+                '"drop" discards the batch. The default is "block".'
+            )
+        )
+        ap.add_argument(
+            '--hec_pool_size',
+            type=int,
+            default=0,
+            help='The maximum number of keep-alive connections to HEC. The default is the total number of uploader threads.'
+        )
+        ap.add_argument(
+            '--hec_retries',
+            type=int,
+            default=DEFAULT_HTTP_RETRIES,
+            help=f'The number of retries with backoff on connection errors and 429/5xx responses from HEC. The default is {DEFAULT_HTTP_RETRIES}.'
+        )
+        ap.add_argument(
+            '--spool_dir',
+            type=str,
+            default='',
+            help=(
+                'The directory to spool batches which fail to be uploaded or overflow the memory limit. '
+                'They are replayed in order once HEC recovers. The spool is disabled by default.'
+            )
+        )
+        ap.add_argument(
+            '--spool_max_size',
+            type=int,
+            default=DEFAULT_SPOOL_MAX_SIZE,
+            help=f'The maximum size of the spool in bytes for each of RAW and CEF logs. The default is {DEFAULT_SPOOL_MAX_SIZE}.'
+        )
+        ap.add_argument(
+            '--spool_max_memory',
+            type=int,
+            default=DEFAULT_SPOOL_MAX_MEMORY,
+            help=(
+                'The maximum size in bytes of batches waiting in memory to be uploaded when the spool is enabled. '
+                f'The default is {DEFAULT_SPOOL_MAX_MEMORY}.'
+            )
+        )
         ap.add_argument(
             '--insecure',
             action='store_true',
@@ -123,6 +256,12 @@ class Settings:
             default='',
             help='Specifies the syslog header format to be used when forwarding received syslog messages.'
         )
+        ap.add_argument(
+            '--metrics_port',
+            type=int,
+            default=0,
+            help='The port number of the HTTP endpoint exporting metrics at /metrics in the Prometheus format. Disabled by default.'
+        )
         ap.add_argument(
             '--print_logs',
             action='store_true',
@@ -132,6 +271,10 @@ class Settings:
 
         self.__syslog_protocol = args.syslog_protocol
         self.__syslog_port = args.syslog_port
+        self.__engine = args.engine
+        self.__workers = max(1, args.workers)
+        self.__udp_recv_buffer_size = args.udp_recv_buffer_size
+        self.__udp_recv_batch_size = max(1, args.udp_recv_batch_size)
         self.__hec_api_url = args.hec_api_url
         if args.hec_api_key_raw == '*':
             self.__hec_api_key_raw = self.__get_pass('API key for RAW logs: ') or None
@@ -148,10 +291,22 @@ class Settings:
             self.__hec_api_key_cef = args.hec_api_key_cef or None
 
         self.__hec_compression = args.hec_compression
+        self.__hec_upload_workers = max(1, args.hec_upload_workers)
+        self.__hec_upload_queue_size = max(1, args.hec_upload_queue_size)
+        self.__hec_backpressure = args.hec_backpressure
+        self.__hec_pool_size = args.hec_pool_size if args.hec_pool_size > 0 else (
+            # Enough connections for all the uploaders of the RAW and CEF senders
+            self.__hec_upload_workers * 2
+        )
+        self.__hec_retries = max(0, args.hec_retries)
+        self.__spool_dir = args.spool_dir or None
+        self.__spool_max_size = args.spool_max_size
+        self.__spool_max_memory = args.spool_max_memory
         self.__insecure = args.insecure
         self.__ignore_non_syslog_message = args.ignore_non_syslog_message
         self.__new_syslog_header = args.new_syslog_header or None
         self.__print_logs = args.print_logs
+        self.__metrics_port = args.metrics_port
         self.__socket_timeout = DEFAULT_SOCKET_TIMEOUT
 
         if args.proxy:
@@ -186,6 +341,54 @@ class Settings:
     ) -> bool:
         return self.__hec_compression
 
+    @property
+    def hec_upload_workers(
+        self
+    ) -> int:
+        return self.__hec_upload_workers
+
+    @property
+    def hec_upload_queue_size(
+        self
+    ) -> int:
+        return self.__hec_upload_queue_size
+
+    @property
+    def hec_backpressure(
+        self
+    ) -> str:
+        return self.__hec_backpressure
+
+    @property
+    def hec_pool_size(
+        self
+    ) -> int:
+        return self.__hec_pool_size
+
+    @property
+    def hec_retries(
+        self
+    ) -> int:
+        return self.__hec_retries
+
+    @property
+    def spool_dir(
+        self
+    ) -> str | None:
+        return self.__spool_dir
+
+    @property
+    def spool_max_size(
+        self
+    ) -> int:
+        return self.__spool_max_size
+
+    @property
+    def spool_max_memory(
+        self
+    ) -> int:
+        return self.__spool_max_memory
+
     @property
     def syslog_protocol(
         self
@@ -198,6 +401,30 @@ class Settings:
     ) -> int:
         return self.__syslog_port
 
+    @property
+    def engine(
+        self
+    ) -> str:
+        return self.__engine
+
+    @property
+    def workers(
+        self
+    ) -> int:
+        return self.__workers
+
+    @property
+    def udp_recv_buffer_size(
+        self
+    ) -> int:
+        return self.__udp_recv_buffer_size
+
+    @property
+    def udp_recv_batch_size(
+        self
+    ) -> int:
+        return self.__udp_recv_batch_size
+
     @property
     def insecure(
         self
@@ -234,6 +461,293 @@ class Settings:
     ) -> bool:
         return self.__print_logs
 
+    @property
+    def metrics_port(
+        self
+    ) -> int:
+        return self.__metrics_port
+
+
+class Metrics:
+    """ Metrics in the Prometheus text exposition format
+    """
+    def __init__(
+        self
+    ) -> None:
+        self.__lock = threading.Lock()
+        # name -> (type, help, buckets)
+        self.__definitions: dict[str, tuple[str, str, tuple[float, ...] | None]] = {}
+        # (name, labels) -> value, or [bucket counts, sum, count] for histograms
+        self.__values: dict[tuple[str, tuple[tuple[str, str], ...]], Any] = {}
+        self.__collectors: list[Callable[['Metrics'], None]] = []
+
+    def define(
+        self,
+        name: str,
+        mtype: str,
+        help: str,
+        buckets: tuple[float, ...] | None = None,
+    ) -> None:
+        """Define a metric.
+
+        :param name: The metric name.
+        :param mtype: The metric type: 'counter', 'gauge' or 'histogram'.
+        :param help: The description of the metric.
+        :param buckets: The upper bounds of the buckets for a histogram.
+        """
+        self.__definitions[name] = (mtype, help, tuple(sorted(buckets)) if buckets else None)
+
+    def add_collector(
+        self,
+        collector: Callable[['Metrics'], None],
+    ) -> None:
+        """Add a function to be called to update gauges before the metrics are exported.
+
+        :param collector: The function to be called with this instance.
+        """
+        with self.__lock:
+            self.__collectors.append(collector)
+
+    def inc(
+        self,
+        name: str,
+        value: float = 1,
+        labels: dict[str, str] | None = None,
+    ) -> None:
+        """Increment a counter.
+
+        :param name: The metric name.
+        :param value: The value to add.
+        :param labels: The labels.
+        """
+        key = (name, tuple(labels.items()) if labels else ())
+        with self.__lock:
+            self.__values[key] = self.__values.get(key, 0) + value
+
+    def set(
+        self,
+        name: str,
+        value: float,
+        labels: dict[str, str] | None = None,
+    ) -> None:
+        """Set a gauge.
+
+        :param name: The metric name.
+        :param value: The value.
+        :param labels: The labels.
+        """
+        key = (name, tuple(labels.items()) if labels else ())
+        with self.__lock:
+            self.__values[key] = value
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        labels: dict[str, str] | None = None,
+    ) -> None:
+        """Observe a value in a histogram.
+
+        :param name: The metric name.
+        :param value: The value observed.
+        :param labels: The labels.
+        """
+        buckets = self.__definitions[name][2]
+        key = (name, tuple(labels.items()) if labels else ())
+        with self.__lock:
+            if (h := self.__values.get(key)) is None:
+                h = self.__values[key] = [[0] * len(buckets), 0, 0]
+            i = bisect.bisect_left(buckets, value)
+            if i < len(buckets):
+                h[0][i] += 1
+            h[1] += value
+            h[2] += 1
+
+    def snapshot(
+        self
+    ) -> dict[tuple[str, tuple[tuple[str, str], ...]], Any]:
+        """Get the current values.
+
+        :return: The values by (name, labels).
+        """
+        with self.__lock:
+            collectors = list(self.__collectors)
+        for collector in collectors:
+            try:
+                collector(self)
+            except Exception:
+                traceback.print_exc()
+
+        with self.__lock:
+            return {
+                k: [list(v[0]), v[1], v[2]] if isinstance(v, list) else v
+                for k, v in self.__values.items()
+            }
+
+    def merge(
+        self,
+        snapshots: list[dict[tuple[str, tuple[tuple[str, str], ...]], Any]],
+    ) -> dict[tuple[str, tuple[tuple[str, str], ...]], Any]:
+        """Combine snapshots, summing up the counters and histograms and taking the max of the gauges.
+
+        :param snapshots: The snapshots.
+        :return: The snapshot combined.
+        """
+        merged = {}
+        for snapshot in snapshots:
+            for k, v in snapshot.items():
+                if (x := merged.get(k)) is None:
+                    merged[k] = [list(v[0]), v[1], v[2]] if isinstance(v, list) else v
+                elif isinstance(v, list):
+                    x[0] = [a + b for a, b in zip(x[0], v[0])]
+                    x[1] += v[1]
+                    x[2] += v[2]
+                elif self.__definitions[k[0]][0] == 'gauge':
+                    merged[k] = max(x, v)
+                else:
+                    merged[k] = x + v
+        return merged
+
+    @staticmethod
+    def __format_labels(
+        labels: tuple[tuple[str, str], ...],
+    ) -> str:
+        if not labels:
+            return ''
+        values = ','.join(
+            '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"'))
+            for k, v in labels
+        )
+        return '{' + values + '}'
+
+    def render(
+        self,
+        snapshot: dict[tuple[str, tuple[tuple[str, str], ...]], Any] | None = None,
+    ) -> str:
+        """Render metrics in the Prometheus text exposition format.
+
+        :param snapshot: The snapshot to render, or None to render the current values.
+        :return: The text.
+        """
+        if snapshot is None:
+            snapshot = self.snapshot()
+
+        by_name: dict[str, list[tuple[tuple[tuple[str, str], ...], Any]]] = {}
+        for (name, labels), value in snapshot.items():
+            by_name.setdefault(name, []).append((labels, value))
+
+        lines = []
+        for name, (mtype, help, buckets) in self.__definitions.items():
+            lines.append(f'# HELP {name} {help}')
+            lines.append(f'# TYPE {name} {mtype}')
+            for labels, value in sorted(by_name.get(name) or [], key=lambda x: x[0]):
+                if mtype == 'histogram':
+                    counts, total, count = value
+                    cumulative = 0
+                    for le, n in zip(buckets, counts):
+                        cumulative += n
+                        lines.append(f'{name}_bucket{Metrics.__format_labels(labels + (("le", repr(float(le))),))} {cumulative}')
+                    lines.append(f'{name}_bucket{Metrics.__format_labels(labels + (("le", "+Inf"),))} {count}')
+                    lines.append(f'{name}_sum{Metrics.__format_labels(labels)} {total}')
+                    lines.append(f'{name}_count{Metrics.__format_labels(labels)} {count}')
+                else:
+                    lines.append(f'{name}{Metrics.__format_labels(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsServer:
+    """ HTTP server exporting metrics at /metrics
+    """
+    def __init__(
+        self,
+        port: int,
+        render: Callable[[], str],
+    ) -> None:
+        """Initialize this instance.
+
+        :param port: The port number to listen on.
+        :param render: The function to get the metrics in the Prometheus text format.
+        """
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(
+                self
+            ) -> None:
+                if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+
+                body = render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(
+                self,
+                format: str,
+                *args: Any,
+            ) -> None:
+                pass
+
+        self.__server = http.server.ThreadingHTTPServer(('', port), Handler)
+        self.__server.daemon_threads = True
+        self.__thread = threading.Thread(
+            target=self.__server.serve_forever,
+            args=(),
+            daemon=True
+        )
+
+    def start(
+        self
+    ) -> None:
+        """Start the server in the background.
+        """
+        self.__thread.start()
+
+    def stop(
+        self
+    ) -> None:
+        """Stop the server.
+        """
+        self.__server.shutdown()
+        self.__server.server_close()
+
+
+def new_metrics(
+) -> Metrics:
+    """Create the metrics of the forwarder.
+
+    :return: The metrics.
+    """
+    metrics = Metrics()
+    for name, mtype, help, buckets in (
+        ('syslog_to_hec_received_messages_total', 'counter', 'Messages received by protocol and source.', None),
+        ('syslog_to_hec_received_bytes_total', 'counter', 'Bytes of messages received by protocol.', None),
+        ('syslog_to_hec_udp_dropped_datagrams_total', 'counter', 'UDP datagrams dropped by the kernel.', None),
+        ('syslog_to_hec_parse_failures_total', 'counter', 'Messages not starting with a syslog header.', None),
+        ('syslog_to_hec_buffered_logs_total', 'counter', 'Logs written into batches.', None),
+        ('syslog_to_hec_sent_logs_total', 'counter', 'Logs sent to HEC.', None),
+        ('syslog_to_hec_failed_logs_total', 'counter', 'Logs failed to be sent to HEC.', None),
+        ('syslog_to_hec_dropped_logs_total', 'counter', 'Logs dropped by the backpressure or the spool limit.', None),
+        ('syslog_to_hec_replayed_logs_total', 'counter', 'Logs replayed from the spool.', None),
+        ('syslog_to_hec_uncompressed_bytes_total', 'counter', 'Bytes of batches before compression.', None),
+        ('syslog_to_hec_compressed_bytes_total', 'counter', 'Bytes of batches after compression.', None),
+        ('syslog_to_hec_batch_logs', 'histogram', 'The number of logs in a batch.', METRICS_BATCH_LOGS_BUCKETS),
+        ('syslog_to_hec_batch_bytes', 'histogram', 'The size of a batch uploaded to HEC.', METRICS_BATCH_BYTES_BUCKETS),
+        ('syslog_to_hec_hec_request_duration_seconds', 'histogram', 'The latency of HEC POST requests.', METRICS_LATENCY_BUCKETS),
+        ('syslog_to_hec_hec_responses_total', 'counter', 'HEC responses by HTTP status code ("error" for no response).', None),
+        ('syslog_to_hec_upload_queue_depth', 'gauge', 'Batches waiting to be uploaded.', None),
+        ('syslog_to_hec_upload_queued_bytes', 'gauge', 'Bytes of batches waiting to be uploaded.', None),
+        ('syslog_to_hec_upload_inflight_batches', 'gauge', 'Batches being uploaded.', None),
+        ('syslog_to_hec_spool_bytes', 'gauge', 'Bytes of batches in the spool.', None),
+        ('syslog_to_hec_spool_oldest_age_seconds', 'gauge', 'The age of the oldest spool segment.', None),
+        ('syslog_to_hec_http_requests_total', 'counter', 'HTTP requests sent over the connection pool.', None),
+        ('syslog_to_hec_http_connections_total', 'counter', 'HTTP connections established.', None),
+    ):
+        metrics.define(name, mtype, help, buckets)
+    return metrics
+
 
 class RestApiClient:
     def __init__(
@@ -246,6 +760,8 @@ class RestApiClient:
         proxy: str | None = None,
         nretry: int = 0,
         ok_codes: tuple[int] | None = None,
+        pool_size: int = DEFAULT_HTTP_POOL_SIZE,
+        retry_backoff: float = DEFAULT_HTTP_RETRY_BACKOFF,
     ):
         """Initialize this instance.
 
@@ -255,19 +771,77 @@ class RestApiClient:
         :param timeout: The connection and read/write timeout in seconds.
         :param insecure: Set to True if the server certificate should not be verified; otherwise, False.
         :param proxy: A proxy in the format host:port.
-        :param nretry: The number of connection and I/O retries.
+        :param nretry: The number of retries on connection errors and 429/5xx responses.
         :param ok_codes: The HTTP status codes to consider as successful (e.g., 200, 201, 204).
+        :param pool_size: The maximum number of keep-alive connections to keep per host.
+        :param retry_backoff: The backoff factor in seconds between retries.
         """
         self.__base_url = base_url
-        self.__userid = userid
-        self.__passwd = passwd
         self.__ctimeout = DEFAULT_SOCKET_TIMEOUT if timeout < DEFAULT_SOCKET_TIMEOUT else timeout
         self.__ntimeout = timeout
-        self.__insecure = insecure
-        self.__proxy = proxy
-        self.__nretry = nretry
         self.__ok_codes = ok_codes or (requests.codes.ok,)
 
+        # The session and its connection pools are shared by all the threads using this client.
+        # requests.Session is safe to share for sending requests as long as its settings
+        # are not modified after the initialization.
+        self.__sess = requests.Session()
+        self.__sess.headers['Connection'] = 'keep-alive'
+        self.__sess.verify = not insecure
+        if userid is not None and passwd is not None:
+            self.__sess.auth = HTTPBasicAuth(userid, passwd)
+        if proxy:
+            self.__sess.proxies = {
+                'http': f'http://{proxy}',
+                'https': f'https://{proxy}',
+            }
+
+        # POST is not idempotent: a request which may have reached the server is not resent
+        # on read errors, not to upload the same batch twice.
+        retries = Retry(
+            total=nretry,
+            read=0,
+            other=0,
+            backoff_factor=retry_backoff,
+            status_forcelist=HTTP_RETRY_STATUS_CODES,
+            allowed_methods=None,
+            raise_on_status=False,
+        ) if nretry > 0 else 0
+
+        # The counts of the pools which have been closed
+        self.__closed_counts = (0, 0)
+        self.__adapters = []
+        for prefix in ('http://', 'https://'):
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=max(1, pool_size),
+                max_retries=retries,
+            )
+            self.__sess.mount(prefix, adapter)
+            self.__adapters.append(adapter)
+
+    @property
+    def statistics(
+        self
+    ) -> dict[str, int]:
+        """The connection pool statistics.
+
+        `connections` is the number of connections established (i.e. TCP/TLS handshakes),
+        and `reused` is the number of requests sent over an existing keep-alive connection.
+        """
+        nconnections, nrequests = self.__closed_counts
+        for adapter in self.__adapters:
+            managers = [adapter.poolmanager, *adapter.proxy_manager.values()]
+            for manager in managers:
+                for key in list(manager.pools.keys()):
+                    if pool := manager.pools.get(key):
+                        nconnections += pool.num_connections
+                        nrequests += pool.num_requests
+        return {
+            'requests': nrequests,
+            'connections': nconnections,
+            'reused': max(0, nrequests - nconnections),
+        }
+
     def request(
         self,
         url_suffix: str,
@@ -295,37 +869,237 @@ class RestApiClient:
 
         ok_codes = ok_codes or self.__ok_codes
 
-        sess = requests.Session()
-        if self.__nretry > 0:
-            sess.mount('http://', requests.adapters.HTTPAdapter(max_retries=self.__nretry))
-            sess.mount('https://', requests.adapters.HTTPAdapter(max_retries=self.__nretry))
-
-        auth = HTTPBasicAuth(
-            self.__userid,
-            self.__passwd
-        ) if (
-            self.__userid is not None and self.__passwd is not None
-        ) else (
-            None
-        )
-        proxies = {
-            'http': f'http://{self.__proxy}',
-            'https': f'https://{self.__proxy}',
-        } if self.__proxy else None
-
-        r = sess.request(
+        r = self.__sess.request(
             method = method.upper(),
             url = url,
             headers = headers,
             data = body,
-            proxies = proxies,
-            verify = not self.__insecure,
             timeout = (self.__ctimeout,self.__ntimeout)
         )
         if r.status_code not in ok_codes and not calmly:
             return r.raise_for_status()
         return r
 
+    def close(
+        self
+    ) -> None:
+        """Close the connections in the pool.
+        """
+        stats = self.statistics
+        self.__closed_counts = (stats['connections'], stats['requests'])
+        self.__sess.close()
+
+
+class Spool:
+    """ Disk-backed spool of HEC batches
+
+    Batches are appended to segment files in order, and replayed from the offset
+    checkpointed in the spool directory, so that they survive restarts.
+    """
+    RECORD_HEADER = struct.Struct('>II')
+    SEGMENT_SUFFIX = '.seg'
+    CHECKPOINT_FILE = 'checkpoint.json'
+
+    def __init__(
+        self,
+        path: str,
+        max_size: int = DEFAULT_SPOOL_MAX_SIZE,
+        segment_size: int = DEFAULT_SPOOL_SEGMENT_SIZE,
+    ) -> None:
+        """Initialize the instance.
+
+        :param path: The directory to store segment files.
+        :param max_size: The maximum total size of segment files in bytes.
+        :param segment_size: The size in bytes at which a new segment file is started.
+        """
+        os.makedirs(path, exist_ok=True)
+        self.__path = path
+        self.__max_size = max_size
+        self.__segment_size = segment_size
+        self.__lock = threading.Lock()
+        self.__cond = threading.Condition(self.__lock)
+        self.__writer = None
+        self.__nspooled = 0
+        self.__nrejected = 0
+
+        # [sequence number, creation time, size] of segments in order
+        self.__segments: list[list[int]] = []
+        for name in sorted(os.listdir(path)):
+            if m := re.fullmatch(r'(\d+)-(\d+)' + re.escape(Spool.SEGMENT_SUFFIX), name):
+                size = os.path.getsize(os.path.join(path, name))
+                self.__segments.append([int(m[1]), int(m[2]), size])
+
+        self.__read_seq, self.__read_offset = self.__load_checkpoint()
+        while self.__segments and self.__segments[0][0] < self.__read_seq:
+            self.__remove_segment(self.__segments.pop(0))
+        if not self.__segments or self.__segments[0][0] != self.__read_seq:
+            self.__read_offset = 0
+
+    def __segment_file(
+        self,
+        segment: list[int],
+    ) -> str:
+        seq, created, _ = segment
+        return os.path.join(self.__path, f'{seq:012d}-{created}{Spool.SEGMENT_SUFFIX}')
+
+    def __remove_segment(
+        self,
+        segment: list[int],
+    ) -> None:
+        try:
+            os.remove(self.__segment_file(segment))
+        except FileNotFoundError:
+            pass
+
+    def __load_checkpoint(
+        self
+    ) -> tuple[int, int]:
+        """Load the replay position.
+
+        :return: The sequence number of the segment and the offset in it.
+        """
+        try:
+            with open(os.path.join(self.__path, Spool.CHECKPOINT_FILE)) as f:
+                checkpoint = json.load(f)
+            return int(checkpoint['segment']), int(checkpoint['offset'])
+        except FileNotFoundError:
+            return 0, 0
+        except Exception:
+            traceback.print_exc()
+            return 0, 0
+
+    def __save_checkpoint(
+        self
+    ) -> None:
+        """Save the replay position.
+        """
+        path = os.path.join(self.__path, Spool.CHECKPOINT_FILE)
+        with open(path + '.tmp', 'w') as f:
+            json.dump({'segment': self.__read_seq, 'offset': self.__read_offset}, f)
+        os.replace(path + '.tmp', path)
+
+    def __size(
+        self
+    ) -> int:
+        size = sum(segment[2] for segment in self.__segments)
+        if self.__segments and self.__segments[0][0] == self.__read_seq:
+            size -= self.__read_offset
+        return size
+
+    @property
+    def statistics(
+        self
+    ) -> dict[str, int]:
+        """The spool statistics.
+        """
+        with self.__lock:
+            size = self.__size()
+            return {
+                'bytes': size,
+                'segments': len(self.__segments),
+                'oldest_age': int(time.time()) - self.__segments[0][1] if size else 0,
+                'spooled_batches': self.__nspooled,
+                'rejected_batches': self.__nrejected,
+            }
+
+    def append(
+        self,
+        data: bytes,
+        nlogs: int,
+    ) -> bool:
+        """Append a batch to the spool.
+
+        :param data: The batch data.
+        :param nlogs: The number of logs in the batch.
+        :return: True if the batch has been spooled, False if the spool is full.
+        """
+        record = Spool.RECORD_HEADER.pack(nlogs, len(data)) + data
+        with self.__lock:
+            if self.__size() + len(record) > self.__max_size:
+                self.__nrejected += 1
+                return False
+
+            if self.__writer is None or self.__segments[-1][2] >= self.__segment_size:
+                if self.__writer is not None:
+                    self.__writer.close()
+                seq = self.__segments[-1][0] + 1 if self.__segments else self.__read_seq
+                segment = [seq, int(time.time()), 0]
+                self.__writer = open(self.__segment_file(segment), 'ab')
+                self.__segments.append(segment)
+
+            self.__writer.write(record)
+            self.__writer.flush()
+            self.__segments[-1][2] += len(record)
+            self.__nspooled += 1
+            self.__cond.notify_all()
+            return True
+
+    def read(
+        self,
+        timeout: float | None = None,
+    ) -> tuple[bytes, int] | None:
+        """Read the batch at the replay position without advancing it.
+
+        :param timeout: The maximum time in seconds to wait for a batch to be spooled.
+        :return: The batch of (data, number of logs), or None if no batch is available.
+        """
+        while True:
+            with self.__lock:
+                while True:
+                    if self.__segments and self.__segments[0][0] != self.__read_seq:
+                        self.__read_seq = self.__segments[0][0]
+                        self.__read_offset = 0
+
+                    if self.__segments and self.__read_offset < self.__segments[0][2]:
+                        path = self.__segment_file(self.__segments[0])
+                        offset = self.__read_offset
+                        break
+                    elif len(self.__segments) > 1:
+                        # The segment has been fully replayed
+                        self.__remove_segment(self.__segments.pop(0))
+                    elif not self.__cond.wait(timeout=timeout):
+                        return None
+
+            # Records below the segment size have been flushed, so they can be read outside the lock.
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                header = f.read(Spool.RECORD_HEADER.size)
+                if len(header) == Spool.RECORD_HEADER.size:
+                    nlogs, length = Spool.RECORD_HEADER.unpack(header)
+                    if len(data := f.read(length)) == length:
+                        return data, nlogs
+
+            # A record truncated by an unexpected shutdown
+            print(f'* Skipped the broken record at offset {offset} in {path}.')
+            with self.__lock:
+                if self.__segments and self.__segments[0][0] == self.__read_seq:
+                    self.__read_offset = self.__segments[0][2]
+                    self.__save_checkpoint()
+
+    def commit(
+        self,
+        batch: tuple[bytes, int],
+    ) -> None:
+        """Advance the replay position past the batch returned by `read`.
+
+        :param batch: The batch replayed.
+        """
+        data, _ = batch
+        with self.__lock:
+            self.__read_offset += Spool.RECORD_HEADER.size + len(data)
+            self.__save_checkpoint()
+
+    def close(
+        self
+    ) -> None:
+        """Close the segment file being written.
+        """
+        with self.__lock:
+            if self.__writer is not None:
+                self.__writer.close()
+                self.__writer = None
+            self.__cond.notify_all()
+
 
 class LogSender:
     """ Log sender for Cortex HTTP Event Collector
@@ -338,6 +1112,8 @@ class LogSender:
             client: RestApiClient,
             api_key: str,
             compression: bool,
+            log_type: str = 'RAW',
+            metrics: Metrics | None = None,
         ) -> None:
             """Initialize the instance.
 
@@ -345,12 +1121,17 @@ class LogSender:
             :param client: The basic HTTP client for the Cortex HTTP Event Collector.
             :param api_key: The API key for authenticating with the Cortex HTTP Event Collector.
             :param compression: Set to True to enable gzip compression for logs; otherwise, False.
+            :param log_type: The log type ('RAW' or 'CEF') for the metrics.
+            :param metrics: The metrics to be updated, or None to disable them.
             """
             self.__client = client
             self.__api_key = api_key
             self.__compression = compression
+            self.__metrics = metrics
+            self.__labels = {'type': log_type}
             self.__buffer = io.BytesIO()
             self.__buffered_nlogs = 0
+            self.__buffered_nbytes = 0
             if compression:
                 self.__log_writer = gzip.GzipFile(mode='wb', fileobj=self.__buffer)
                 self.__content_type = 'application/gzip'
@@ -361,32 +1142,34 @@ class LogSender:
         def send_log(
             self,
             log: str,
-        ) -> int:
-            """Send an event log.
+        ) -> tuple[bytes, int] | None:
+            """Write an event log into the buffer.
 
             :param log: The event log to be sent.
-            :return: The number of log entries successfully flushed.
+            :return: The batch of (data, number of logs) detached if the buffer is full, otherwise None.
             """
-            self.__log_writer.write((log + '\n').encode())
+            self.__buffered_nbytes += self.__log_writer.write((log + '\n').encode())
             self.__buffered_nlogs += 1
 
             if self.__buffer.getbuffer().nbytes > HEC_UPLOAD_SIZE_THRESHOLD:
-                return self.flush()
+                return self.detach()
             else:
-                return 0
+                return None
 
-        def flush(
+        def detach(
             self
-        ) -> int:
-            """Finish writing logs
+        ) -> tuple[bytes, int] | None:
+            """Finish writing logs and switch to a fresh buffer.
 
-            :return: The number of log entries successfully flushed.
+            :return: The batch of (data, number of logs) detached, or None if no logs are buffered.
             """
             if not self.__buffered_nlogs:
-                return 0
+                return None
 
             nlogs = self.__buffered_nlogs
+            nbytes = self.__buffered_nbytes
             self.__buffered_nlogs = 0
+            self.__buffered_nbytes = 0
 
             # Flush the cache
             if self.__compression:
@@ -400,15 +1183,47 @@ class LogSender:
             else:
                 self.__log_writer = self.__buffer
 
-            _ = self.__client.request(
-                url_suffix='/logs/v1/event',
-                method='POST',
-                headers={
-                    'Authorization': self.__api_key,
-                    'Content-Type': self.__content_type,
-                },
-                body=data
-            )
+            if metrics := self.__metrics:
+                metrics.inc('syslog_to_hec_buffered_logs_total', nlogs, self.__labels)
+                metrics.inc('syslog_to_hec_uncompressed_bytes_total', nbytes, self.__labels)
+                metrics.inc('syslog_to_hec_compressed_bytes_total', len(data), self.__labels)
+                metrics.observe('syslog_to_hec_batch_logs', nlogs, self.__labels)
+                metrics.observe('syslog_to_hec_batch_bytes', len(data), self.__labels)
+
+            return data, nlogs
+
+        def upload(
+            self,
+            batch: tuple[bytes, int],
+        ) -> int:
+            """Upload a batch to HEC.
+
+            :param batch: The batch of (data, number of logs) to be uploaded.
+            :return: The number of log entries successfully sent.
+            """
+            data, nlogs = batch
+            t = time.monotonic()
+            code = 'error'
+            try:
+                r = self.__client.request(
+                    url_suffix='/logs/v1/event',
+                    method='POST',
+                    headers={
+                        'Authorization': self.__api_key,
+                        'Content-Type': self.__content_type,
+                    },
+                    body=data,
+                    calmly=True
+                )
+                code = str(r.status_code)
+                r.raise_for_status()
+            finally:
+                if metrics := self.__metrics:
+                    metrics.observe('syslog_to_hec_hec_request_duration_seconds', time.monotonic() - t, self.__labels)
+                    metrics.inc('syslog_to_hec_hec_responses_total', 1, {**self.__labels, 'code': code})
+
+            if self.__metrics:
+                self.__metrics.inc('syslog_to_hec_sent_logs_total', nlogs, self.__labels)
             print(f'* {nlogs} logs have been sent to HEC.')
             return nlogs
 
@@ -416,7 +1231,14 @@ class LogSender:
         self,
         client: RestApiClient,
         api_key: str,
-        compression: bool
+        compression: bool,
+        nworkers: int = DEFAULT_HEC_UPLOAD_WORKERS,
+        queue_size: int = DEFAULT_HEC_UPLOAD_QUEUE_SIZE,
+        backpressure: str = 'block',
+        spool: Spool | None = None,
+        max_memory: int = DEFAULT_SPOOL_MAX_MEMORY,
+        log_type: str = 'RAW',
+        metrics: Metrics | None = None,
     ) -> None:
         """ Initialize the instance
 
@@ -424,12 +1246,51 @@ class LogSender:
         :param client: The basic HTTP client for Cortex HTTP Event Collector
         :param api_key: An API Key for Cortex HTTP Event Collector
         :param compression: Set to True to compress logs by gzip, otherwise False.
+        :param nworkers: The number of uploader threads.
+        :param queue_size: The maximum number of batches waiting to be uploaded.
+        :param backpressure: 'block' to wait for the upload queue to have room, or 'drop' to discard batches when it's full.
+        :param spool: The disk spool to absorb backlogged and failed batches instead of applying the backpressure.
+        :param max_memory: The maximum size in bytes of batches waiting in memory when the spool is enabled.
+        :param log_type: The log type ('RAW' or 'CEF') for the metrics.
+        :param metrics: The metrics to be updated, or None to disable them.
         """
+        if backpressure not in ('block', 'drop'):
+            raise ValueError(f'Invalid backpressure mode - {backpressure}')
+
         self.__sender = LogSender.BufferredSender(
             client=client,
             api_key=api_key,
-            compression=compression
+            compression=compression,
+            log_type=log_type,
+            metrics=metrics
         )
+        self.__backpressure = backpressure
+        self.__spool = spool
+        self.__max_memory = max_memory
+        self.__queue = queue.Queue(maxsize=max(1, queue_size))
+        self.__stats_lock = threading.Lock()
+        self.__queued_bytes = 0
+        self.__ninflight = 0
+        self.__nsent_batches = 0
+        self.__nsent_logs = 0
+        self.__nfailed_batches = 0
+        self.__nfailed_logs = 0
+        self.__ndropped_batches = 0
+        self.__ndropped_logs = 0
+        self.__nreplayed_batches = 0
+        self.__nreplayed_logs = 0
+        self.__replay_history: collections.deque[tuple[float, int]] = collections.deque()
+
+        self.__uploaders = [
+            threading.Thread(
+                target=self.__upload,
+                args=(),
+                daemon=False
+            ) for _ in range(max(1, nworkers))
+        ]
+        for uploader in self.__uploaders:
+            uploader.start()
+
         self.__lock = threading.Lock()
         self.__cond = threading.Condition(self.__lock)
         self.__done = False
@@ -440,18 +1301,215 @@ class LogSender:
         )
         self.__flusher.start()
 
+        if metrics:
+            metrics.add_collector(functools.partial(self.__collect_metrics, labels={'type': log_type}))
+
+        if spool:
+            self.__replayer = threading.Thread(
+                target=self.__replay,
+                args=(),
+                daemon=False
+            )
+            self.__replayer.start()
+        else:
+            self.__replayer = None
+
+    @property
+    def statistics(
+        self
+    ) -> dict[str, int]:
+        """The statistics of the upload pipeline.
+        """
+        stats = self.__spool.statistics if self.__spool else {}
+        with self.__stats_lock:
+            if self.__spool:
+                # The number of logs replayed per second in the last stats interval
+                t = time.monotonic() - DEFAULT_STATS_INTERVAL
+                while self.__replay_history and self.__replay_history[0][0] < t:
+                    self.__replay_history.popleft()
+                stats = {
+                    'spool_bytes': stats['bytes'],
+                    'spool_segments': stats['segments'],
+                    'spool_oldest_age': stats['oldest_age'],
+                    'spooled_batches': stats['spooled_batches'],
+                    'replayed_batches': self.__nreplayed_batches,
+                    'replayed_logs': self.__nreplayed_logs,
+                    'replay_rate': sum(n for _, n in self.__replay_history) // DEFAULT_STATS_INTERVAL,
+                }
+            return {
+                'queue_depth': self.__queue.qsize(),
+                'queued_bytes': self.__queued_bytes,
+                'inflight_batches': self.__ninflight,
+                'sent_batches': self.__nsent_batches,
+                'sent_logs': self.__nsent_logs,
+                'failed_batches': self.__nfailed_batches,
+                'failed_logs': self.__nfailed_logs,
+                'dropped_batches': self.__ndropped_batches,
+                'dropped_logs': self.__ndropped_logs,
+                **stats,
+            }
+
+    def __collect_metrics(
+        self,
+        metrics: Metrics,
+        labels: dict[str, str],
+    ) -> None:
+        """Update the metrics with the statistics.
+
+        :param metrics: The metrics.
+        :param labels: The labels of the metrics.
+        """
+        stats = self.statistics
+        metrics.set('syslog_to_hec_upload_queue_depth', stats['queue_depth'], labels)
+        metrics.set('syslog_to_hec_upload_queued_bytes', stats['queued_bytes'], labels)
+        metrics.set('syslog_to_hec_upload_inflight_batches', stats['inflight_batches'], labels)
+        metrics.set('syslog_to_hec_failed_logs_total', stats['failed_logs'], labels)
+        metrics.set('syslog_to_hec_dropped_logs_total', stats['dropped_logs'], labels)
+        if self.__spool:
+            metrics.set('syslog_to_hec_spool_bytes', stats['spool_bytes'], labels)
+            metrics.set('syslog_to_hec_spool_oldest_age_seconds', stats['spool_oldest_age'], labels)
+            metrics.set('syslog_to_hec_replayed_logs_total', stats['replayed_logs'], labels)
+
+    def __spool_batch(
+        self,
+        batch: tuple[bytes, int],
+    ) -> int:
+        """Write a batch to the spool.
+
+        :param batch: The batch of (data, number of logs).
+        :return: The number of log entries spooled.
+        """
+        data, nlogs = batch
+        if self.__spool.append(data, nlogs):
+            return nlogs
+
+        with self.__stats_lock:
+            self.__ndropped_batches += 1
+            self.__ndropped_logs += nlogs
+        print(f'* {nlogs} logs have been dropped as the spool is full.')
+        return 0
+
+    def __enqueue(
+        self,
+        batch: tuple[bytes, int] | None,
+        block: bool = False,
+    ) -> int:
+        """Hand off a batch to the uploaders.
+
+        :param batch: The batch of (data, number of logs) to be uploaded.
+        :param block: Set to True to wait for room regardless of the backpressure mode.
+        :return: The number of log entries queued.
+        """
+        if batch is None:
+            return 0
+
+        data, nlogs = batch
+        if self.__spool:
+            with self.__stats_lock:
+                overflow = self.__queued_bytes + len(data) > self.__max_memory
+                if not overflow:
+                    self.__queued_bytes += len(data)
+            if not overflow:
+                try:
+                    self.__queue.put_nowait(batch)
+                    return nlogs
+                except queue.Full:
+                    with self.__stats_lock:
+                        self.__queued_bytes -= len(data)
+            return self.__spool_batch(batch)
+
+        with self.__stats_lock:
+            self.__queued_bytes += len(data)
+        if block or self.__backpressure == 'block':
+            self.__queue.put(batch)
+        else:
+            try:
+                self.__queue.put_nowait(batch)
+            except queue.Full:
+                with self.__stats_lock:
+                    self.__queued_bytes -= len(data)
+                    self.__ndropped_batches += 1
+                    self.__ndropped_logs += nlogs
+                print(f'* {nlogs} logs have been dropped as the upload queue is full.')
+                return 0
+        return nlogs
+
+    def __upload(
+        self
+    ) -> None:
+        """Upload batches in the queue until a stop request is received
+        """
+        while (batch := self.__queue.get()) is not None:
+            with self.__stats_lock:
+                self.__queued_bytes -= len(batch[0])
+                self.__ninflight += 1
+            try:
+                nlogs = self.__sender.upload(batch)
+                with self.__stats_lock:
+                    self.__nsent_batches += 1
+                    self.__nsent_logs += nlogs
+            except Exception:
+                traceback.print_exc()
+                if self.__spool:
+                    self.__spool_batch(batch)
+                else:
+                    with self.__stats_lock:
+                        self.__nfailed_batches += 1
+                        self.__nfailed_logs += batch[1]
+            finally:
+                with self.__stats_lock:
+                    self.__ninflight -= 1
+
+    def __replay(
+        self
+    ) -> None:
+        """Upload batches in the spool in order until the sender finishes
+        """
+        retry_interval = DEFAULT_SPOOL_RETRY_INTERVAL
+        next_report = time.monotonic() + DEFAULT_STATS_INTERVAL
+        while not self.__done:
+            if time.monotonic() >= next_report:
+                next_report = time.monotonic() + DEFAULT_STATS_INTERVAL
+                stats = self.statistics
+                if stats['spool_bytes']:
+                    print(
+                        f'* {stats["spool_bytes"]} bytes in {stats["spool_segments"]} spool segments'
+                        f' (the oldest is {stats["spool_oldest_age"]}s old), replaying {stats["replay_rate"]} logs/s.'
+                    )
+
+            try:
+                if (batch := self.__spool.read(timeout=1)) is None:
+                    continue
+                nlogs = self.__sender.upload(batch)
+                self.__spool.commit(batch)
+            except Exception:
+                traceback.print_exc()
+                with self.__lock:
+                    self.__cond.wait_for(lambda: self.__done, timeout=retry_interval)
+                retry_interval = min(retry_interval * 2, DEFAULT_SPOOL_MAX_RETRY_INTERVAL)
+                continue
+
+            retry_interval = DEFAULT_SPOOL_RETRY_INTERVAL
+            with self.__stats_lock:
+                self.__nreplayed_batches += 1
+                self.__nreplayed_logs += nlogs
+                self.__replay_history.append((time.monotonic(), nlogs))
+
     def __periodic_flush(
         self
     ) -> None:
         """Flush the send buffer at intervals
         """
         timeout = DEFAULT_LOG_FLUSH_INTERVAL
-        with self.__lock:
-            while not self.__cond.wait_for(
-                lambda: self.__done,
-                timeout=timeout
-            ):
-                self.__sender.flush()
+        while True:
+            with self.__lock:
+                if self.__cond.wait_for(
+                    lambda: self.__done,
+                    timeout=timeout
+                ):
+                    break
+                batch = self.__sender.detach()
+            self.__enqueue(batch)
 
     def send_log(
         self,
@@ -460,20 +1518,38 @@ class LogSender:
         """Send an event log.
 
         :param log: The event log to be sent.
-        :return: The number of log entries that were successfully flushed.
+        :return: The number of log entries that were handed off to the uploaders.
         """
         with self.__lock:
-            return self.__sender.send_log(log)
+            batch = self.__sender.send_log(log)
+        return self.__enqueue(batch)
+
+    def send_logs(
+        self,
+        logs: list[str],
+    ) -> int:
+        """Send event logs at once.
+
+        :param logs: The event logs to be sent.
+        :return: The number of log entries that were handed off to the uploaders.
+        """
+        batches = []
+        with self.__lock:
+            for log in logs:
+                if batch := self.__sender.send_log(log):
+                    batches.append(batch)
+        return sum(self.__enqueue(batch) for batch in batches)
 
     def flush(
         self
     ) -> int:
         """Flush the pending logs to be sent.
 
-        :return: The number of log entries that were flushed.
+        :return: The number of log entries that were handed off to the uploaders.
         """
         with self.__lock:
-            return self.__sender.flush()
+            batch = self.__sender.detach()
+        return self.__enqueue(batch)
 
     def finish(
         self
@@ -482,13 +1558,148 @@ class LogSender:
         """
         done = False
         with self.__lock:
-            if not done:
+            if not self.__done:
                 done = self.__done = True
-                self.__cond.notify()
+                self.__cond.notify_all()
 
         if done:
             self.__flusher.join()
-            self.__sender.flush()
+            with self.__lock:
+                batch = self.__sender.detach()
+            self.__enqueue(batch, block=True)
+
+            for _ in self.__uploaders:
+                self.__queue.put(None)
+            for uploader in self.__uploaders:
+                uploader.join()
+
+            if self.__spool:
+                self.__replayer.join()
+                self.__spool.close()
+
+
+class SyslogHeader(NamedTuple):
+    """ The syslog header fields used to forward a message
+    """
+    pri: str | None
+    host: str | None
+    app: str | None
+    proc_id: str | None
+    msg_id: str | None
+    structured_data: str | None
+    msg: str | None
+
+
+class SyslogHeaderParser:
+    """ Syslog header parser for RFC 3164 and RFC 5424
+
+    <PRI> is parsed by hand, and the message is dispatched on the character after it
+    to the pattern of either RFC 3164 or RFC 5424 anchored at that position, which
+    captures only the fields used to forward the message. `PATTERN` is the reference
+    which defines the behavior, and the results are identical to `parse_by_regex`.
+    """
+    PATTERN = re.compile(
+        (
+            r'^(?:<(?P<pri>\d{1,3})>)(?:(:?(?P<datetime_3164>(?P<mon>Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec))'
+            r' +(?P<day>\d{1,2}) (?P<time>\d{2}:\d{2}:\d{2})) (?P<host_3164>\S+)'
+            r' (?:(?P<tag>[^:\[]{1,32})(?:\[(?P<pid>\d*)\])?: )?(?P<msg_3164>.*)'
+            r'|'
+            r'(?P<version>\d{1,2})'
+            r' (?:-|(?P<datetime_5424>\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:.\d{1,6})?(?:Z|[+-]\d{2}:\d{2})))'
+            r' (?:-|(?P<host_5424>\S{1,255})) (?:-|(?P<app>\S{1,48})) (?:-|(?P<proc_id>\S{1,128}))'
+            r' (?:-|(?P<msg_id>\S{1,32})) (?:-|(?P<structured_data>\[(?:[^ =\]]+)'
+            r' (?:(?:[^\]\\]|\\.)*)\]))(?: (?P<msg_5424>.*))?)'
+        )
+    )
+    # The header after <PRI> in RFC 3164: (host, tag, pid, msg)
+    PATTERN_3164 = re.compile(
+        r':?(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec) +\d{1,2} \d{2}:\d{2}:\d{2}'
+        r' (\S+) (?:([^:\[]{1,32})(?:\[(\d*)\])?: )?(.*)'
+    )
+    # The header after <PRI> in RFC 5424: (host, app, proc_id, msg_id, structured_data, msg)
+    PATTERN_5424 = re.compile(
+        r'\d{1,2} (?:-|\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:.\d{1,6})?(?:Z|[+-]\d{2}:\d{2}))'
+        r' (?:-|(\S{1,255})) (?:-|(\S{1,48})) (?:-|(\S{1,128})) (?:-|(\S{1,32}))'
+        r' (?:-|(\[(?:[^ =\]]+) (?:(?:[^\]\\]|\\.)*)\]))(?: (.*))?'
+    )
+
+    @staticmethod
+    def parse_by_regex(
+        log: str,
+    ) -> SyslogHeader | None:
+        """Parse a syslog message with the reference regular expression.
+
+        :param log: The log message.
+        :return: The syslog header, or None if the message doesn't start with a syslog header.
+        """
+        if (m := SyslogHeaderParser.PATTERN.match(log)) is None:
+            return None
+        return SyslogHeader(
+            pri=m.group('pri'),
+            host=m.group('host_3164') or m.group('host_5424'),
+            app=m.group('tag') or m.group('app'),
+            proc_id=m.group('pid') if m.group('pid') is not None else m.group('proc_id'),
+            msg_id=m.group('msg_id'),
+            structured_data=m.group('structured_data'),
+            msg=m.group('msg_3164') if m.group('msg_3164') is not None else m.group('msg_5424'),
+        )
+
+    @staticmethod
+    def parse(
+        log: str,
+    ) -> SyslogHeader | None:
+        """Parse a syslog message.
+
+        :param log: The log message.
+        :return: The syslog header, or None if the message doesn't start with a syslog header.
+        """
+        # <PRI>
+        e = log.find('>', 1, 5)
+        if e < 2 or not log.startswith('<'):
+            return None
+        pri = log[1:e]
+        if not pri.isdecimal():
+            return None
+
+        # NamedTuple.__new__ is much slower than tuple.__new__
+        if log[e + 1:e + 2].isdecimal():
+            if m := SyslogHeaderParser.PATTERN_5424.match(log, e + 1):
+                return tuple.__new__(SyslogHeader, (pri, *m.groups()))
+        elif m := SyslogHeaderParser.PATTERN_3164.match(log, e + 1):
+            host, tag, pid, msg = m.groups()
+            return tuple.__new__(SyslogHeader, (pri, host, tag, pid, None, None, msg))
+        return None
+
+
+class SyslogTimestampCache:
+    """ Cache of the timestamps rendered for syslog headers
+
+    Timestamps are rendered once per second.
+    """
+    def __init__(
+        self,
+        fmt: str,
+    ) -> None:
+        """Initialize this instance.
+
+        :param fmt: The strftime format of the timestamp in UTC.
+        """
+        self.__fmt = fmt
+        self.__cache = (None, '')
+
+    def now(
+        self
+    ) -> str:
+        """Get the current time rendered.
+
+        :return: The timestamp.
+        """
+        t = int(time.time())
+        sec, s = self.__cache
+        if sec != t:
+            s = time.strftime(self.__fmt, time.gmtime(t))
+            self.__cache = (t, s)
+        return s
 
 
 class LogForwarder:
@@ -497,91 +1708,218 @@ class LogForwarder:
     def __init__(
         self,
         settings: Settings,
+        worker_id: int | None = None,
+        metrics: Metrics | None = None,
     ) -> None:
+        """Initialize this instance.
+
+        :param settings: The settings.
+        :param worker_id: The worker ID when running in a worker process, otherwise None.
+        :param metrics: The metrics to be updated, or None to disable them.
+        """
         self.__settings = settings
+        self.__metrics = metrics
+        self.__metrics_sources: set[str] = set()
+        # Each worker has its own spool as it can't be shared between processes
+        spool_dir = settings.spool_dir and (
+            settings.spool_dir if worker_id is None else os.path.join(settings.spool_dir, f'worker-{worker_id}')
+        )
+        # The RAW and CEF senders share the connection pool
+        self.__client = RestApiClient(
+            base_url=settings.hec_api_url,
+            insecure=settings.insecure,
+            proxy=settings.proxy,
+            nretry=settings.hec_retries,
+            pool_size=settings.hec_pool_size
+        )
         if settings.hec_api_key_raw:
             self.__hec_raw = LogSender(
-                client=RestApiClient(
-                    base_url=settings.hec_api_url,
-                    insecure=settings.insecure,
-                    proxy=settings.proxy
-                ),
+                client=self.__client,
                 api_key=settings.hec_api_key_raw,
-                compression=settings.hec_compression
+                compression=settings.hec_compression,
+                nworkers=settings.hec_upload_workers,
+                queue_size=settings.hec_upload_queue_size,
+                backpressure=settings.hec_backpressure,
+                spool=Spool(
+                    path=os.path.join(spool_dir, 'raw'),
+                    max_size=settings.spool_max_size
+                ) if spool_dir else None,
+                max_memory=settings.spool_max_memory,
+                log_type='RAW',
+                metrics=metrics
             )
         else:
             self.__hec_raw = None
 
         if settings.hec_api_key_cef:
             self.__hec_cef = LogSender(
-                client=RestApiClient(
-                    base_url=settings.hec_api_url,
-                    insecure=settings.insecure,
-                    proxy=settings.proxy
-                ),
+                client=self.__client,
                 api_key=settings.hec_api_key_cef,
-                compression=settings.hec_compression
+                compression=settings.hec_compression,
+                nworkers=settings.hec_upload_workers,
+                queue_size=settings.hec_upload_queue_size,
+                backpressure=settings.hec_backpressure,
+                spool=Spool(
+                    path=os.path.join(spool_dir, 'cef'),
+                    max_size=settings.spool_max_size
+                ) if spool_dir else None,
+                max_memory=settings.spool_max_memory,
+                log_type='CEF',
+                metrics=metrics
             )
         else:
             self.__hec_cef = None
 
-        self.__syslog_pattern = re.compile(
-            (
-                r'^(?:<(?P<pri>\d{1,3})>)(?:(:?(?P<datetime_3164>(?P<mon>Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec))'
-                r' +(?P<day>\d{1,2}) (?P<time>\d{2}:\d{2}:\d{2})) (?P<host_3164>\S+)'
-                r' (?:(?P<tag>[^:\[]{1,32})(?:\[(?P<pid>\d*)\])?: )?(?P<msg_3164>.*)'
-                r'|'
-                r'(?P<version>\d{1,2})'
-                r' (?:-|(?P<datetime_5424>\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:.\d{1,6})?(?:Z|[+-]\d{2}:\d{2})))'
-                r' (?:-|(?P<host_5424>\S{1,255})) (?:-|(?P<app>\S{1,48})) (?:-|(?P<proc_id>\S{1,128}))'
-                r' (?:-|(?P<msg_id>\S{1,32})) (?:-|(?P<structured_data>\[(?:[^ =\]]+)'
-                r' (?:(?:[^\]\\]|\\.)*)\]))(?: (?P<msg_5424>.*))?)'
-            )
-        )
+        self.__hostname = socket.gethostname()
+        if settings.new_syslog_header == 'RFC3164':
+            self.__timestamp = SyslogTimestampCache('%b %d %H:%M:%S')
+        else:
+            self.__timestamp = SyslogTimestampCache('%Y-%m-%dT%H:%M:%SZ')
 
-    def send_log(
+        if metrics:
+            metrics.add_collector(self.__collect_metrics)
+
+    @property
+    def metrics(
+        self
+    ) -> Metrics | None:
+        """The metrics, or None if they are disabled.
+        """
+        return self.__metrics
+
+    def __collect_metrics(
         self,
-        log: str,
+        metrics: Metrics,
     ) -> None:
-        """Send a log message.
+        """Update the metrics with the statistics of the connection pool.
 
-        :param log: The log message to be sent.
+        :param metrics: The metrics.
+        """
+        stats = self.__client.statistics
+        metrics.set('syslog_to_hec_http_requests_total', stats['requests'])
+        metrics.set('syslog_to_hec_http_connections_total', stats['connections'])
+
+    def count_received(
+        self,
+        protocol: str,
+        sources: dict[str, int],
+        nbytes: int,
+    ) -> None:
+        """Count messages received in the metrics.
+
+        :param protocol: The protocol ('udp' or 'tcp').
+        :param sources: The number of messages received by source IP address.
+        :param nbytes: The number of bytes received.
+        """
+        if not (metrics := self.__metrics):
+            return
+
+        for source, nmessages in sources.items():
+            # Limit the number of time series
+            if source not in self.__metrics_sources:
+                if len(self.__metrics_sources) < METRICS_MAX_SOURCES:
+                    self.__metrics_sources.add(source)
+                else:
+                    source = 'other'
+            metrics.inc('syslog_to_hec_received_messages_total', nmessages, {'protocol': protocol, 'source': source})
+        metrics.inc('syslog_to_hec_received_bytes_total', nbytes, {'protocol': protocol})
+
+    def __build_log(
+        self,
+        log: str,
+    ) -> tuple[str, str] | None:
+        """Build a log message to be sent.
+
+        :param log: The log message received.
+        :return: The log type ('CEF' or 'RAW') and the log message to be sent, or None if it should be discarded.
         """
         syslog_message = None
+        header = None
         if (
             self.__settings.ignore_non_syslog_message or
             (self.__settings.new_syslog_header or '') in ('RFC3164', 'RFC5424') or
             self.__hec_cef
         ):
-            if syslog_params := self.__syslog_pattern.match(log):
-                syslog_message = syslog_params.group('msg_3164') or syslog_params.group('msg_5424') or ''
-            elif self.__settings.ignore_non_syslog_message:
-                return
+            if header := SyslogHeaderParser.parse(log):
+                syslog_message = header.msg or ''
+            else:
+                if self.__metrics:
+                    self.__metrics.inc('syslog_to_hec_parse_failures_total')
+                if self.__settings.ignore_non_syslog_message:
+                    return None
 
         if (self.__settings.new_syslog_header or '') in ('RFC3164', 'RFC5424'):
-            t = datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc)
-            pri = syslog_params.group('pri') or '0'
-            host = syslog_params.group('host_3164') or syslog_params.group('host_5424') or socket.gethostname()
+            t = self.__timestamp.now()
+            pri = (header and header.pri) or '0'
+            host = (header and header.host) or self.__hostname
             msg = log if syslog_message is None else syslog_message
             if self.__settings.new_syslog_header == 'RFC3164':
-                log = f'<{pri}>{t.strftime("%b %d %H:%M:%S")} {host} {msg}'
+                log = f'<{pri}>{t} {host} {msg}'
             else:
-                app = syslog_params.group('tag') or syslog_params.group('app') or '-'
-                proc_id = syslog_params.group('pid') or syslog_params.group('proc_id') or '-'
-                msg_id = syslog_params.group('msg_id') or '-'
-                structured_data = syslog_params.group('structured_data') or '-'
-                log = f'<{pri}>1 {t.strftime("%Y-%m-%dT%H:%M:%SZ")} {host} {app} {proc_id} {msg_id} {structured_data} {msg}'
+                app = (header and header.app) or '-'
+                proc_id = (header and header.proc_id) or '-'
+                msg_id = (header and header.msg_id) or '-'
+                structured_data = (header and header.structured_data) or '-'
+                log = f'<{pri}>1 {t} {host} {app} {proc_id} {msg_id} {structured_data} {msg}'
 
         if self.__hec_cef and (syslog_message or '').startswith('CEF:'):
-            self.__hec_cef.send_log(log)
-            if self.__settings.print_logs:
-                print(f'[CEF] {log}')
+            return 'CEF', log
+        elif self.__hec_raw:
+            return 'RAW', log
+        else:
+            return None
+
+    def send_log(
+        self,
+        log: str,
+    ) -> None:
+        """Send a log message.
+
+        :param log: The log message to be sent.
+        """
+        if (x := self.__build_log(log)) is None:
             return
 
-        if self.__hec_raw:
+        log_type, log = x
+        if log_type == 'CEF':
+            self.__hec_cef.send_log(log)
+        else:
             self.__hec_raw.send_log(log)
+
+        if self.__settings.print_logs:
+            print(f'[{log_type}] {log}')
+
+    def send_logs(
+        self,
+        logs: list[str],
+    ) -> None:
+        """Send log messages at once.
+
+        :param logs: The log messages to be sent.
+        """
+        raw_logs = []
+        cef_logs = []
+        for log in logs:
+            try:
+                if (x := self.__build_log(log)) is None:
+                    continue
+            except Exception:
+                traceback.print_exc()
+                continue
+
+            log_type, log = x
+            if log_type == 'CEF':
+                cef_logs.append(log)
+            else:
+                raw_logs.append(log)
+
             if self.__settings.print_logs:
-                print(f'[RAW] {log}')
+                print(f'[{log_type}] {log}')
+
+        if cef_logs:
+            self.__hec_cef.send_logs(cef_logs)
+        if raw_logs:
+            self.__hec_raw.send_logs(raw_logs)
 
     def flush(
         self,
@@ -593,6 +1931,21 @@ class LogForwarder:
         if self.__hec_cef:
             self.__hec_cef.flush()
 
+    @property
+    def statistics(
+        self,
+    ) -> dict[str, dict[str, int]]:
+        """The statistics of the HEC senders.
+        """
+        stats = {
+            'HTTP': self.__client.statistics,
+        }
+        if self.__hec_raw:
+            stats['RAW'] = self.__hec_raw.statistics
+        if self.__hec_cef:
+            stats['CEF'] = self.__hec_cef.statistics
+        return stats
+
     def finish(
         self,
     ) -> None:
@@ -600,6 +1953,206 @@ class LogForwarder:
             self.__hec_raw.finish()
         if self.__hec_cef:
             self.__hec_cef.finish()
+        print(f'* HEC sender statistics: {json.dumps(self.statistics)}')
+        self.__client.close()
+
+
+class SyslogStreamReader:
+    """ Syslog message reader for a TCP stream (RFC 6587)
+
+    Both the octet-counting framing and the non-transparent (LF-delimited) framing
+    are supported. The framing is detected at the first byte of each connection.
+    Data is received into a reusable buffer in large chunks, and messages are sliced
+    out of it without copying payloads.
+    """
+    FRAMING_OCTET_COUNTING = 'octet-counting'
+    FRAMING_NON_TRANSPARENT = 'non-transparent'
+
+    MAX_LENGTH_DIGITS = 10
+
+    def __init__(
+        self,
+        sock: socket.socket,
+        buffer_size: int = DEFAULT_TCP_RECV_BUFFER_SIZE,
+        max_message_size: int = SYSLOG_MAX_MESSAGE_SIZE,
+    ) -> None:
+        """Initialize this instance.
+
+        :param sock: The connected socket to read.
+        :param buffer_size: The initial size of the receive buffer.
+        :param max_message_size: The maximum size of a syslog message.
+        """
+        self.__sock = sock
+        self.__max_message_size = max_message_size
+        self.__buffer = bytearray(max(1, buffer_size))
+        self.__view = memoryview(self.__buffer)
+        self.__start = 0
+        self.__end = 0
+        self.__framing = None
+        self.__nrecvs = 0
+        self.__nmessages = 0
+        self.__nbytes = 0
+
+    @property
+    def framing(
+        self
+    ) -> str | None:
+        """The framing detected, or None if nothing has been received yet.
+        """
+        return self.__framing
+
+    @property
+    def nrecvs(
+        self
+    ) -> int:
+        """The number of recv calls issued.
+        """
+        return self.__nrecvs
+
+    @property
+    def nmessages(
+        self
+    ) -> int:
+        """The number of messages read.
+        """
+        return self.__nmessages
+
+    @property
+    def nbytes(
+        self
+    ) -> int:
+        """The number of bytes received.
+        """
+        return self.__nbytes
+
+    def __reserve(
+        self,
+        size: int,
+    ) -> None:
+        """Make the buffer large enough to hold `size` bytes from the current position.
+
+        :param size: The number of bytes required.
+        """
+        if size <= len(self.__buffer):
+            return
+
+        self.__view.release()
+        self.__buffer.extend(bytes(max(size, len(self.__buffer) * 2) - len(self.__buffer)))
+        self.__view = memoryview(self.__buffer)
+
+    def __fill(
+        self
+    ) -> bool:
+        """Receive data into the buffer.
+
+        :return: False if the connection has been closed by the peer, otherwise True.
+        """
+        # Move the incomplete message to the beginning of the buffer
+        if self.__start:
+            n = self.__end - self.__start
+            self.__view[:n] = self.__view[self.__start:self.__end]
+            self.__start = 0
+            self.__end = n
+
+        if self.__end == len(self.__buffer):
+            self.__reserve(self.__end + 1)
+
+        n = self.__sock.recv_into(self.__view[self.__end:])
+        self.__nrecvs += 1
+        if not n:
+            return False
+        self.__end += n
+        self.__nbytes += n
+        return True
+
+    def __decode(
+        self,
+        start: int,
+        end: int,
+    ) -> str:
+        """Decode a message in the buffer.
+
+        :param start: The start position of the message.
+        :param end: The end position of the message.
+        :return: The message decoded.
+        """
+        self.__nmessages += 1
+        return str(self.__view[start:end], 'utf-8', 'ignore').rstrip('\r\n')
+
+    def __next_message(
+        self
+    ) -> str | None:
+        """Slice out the next message from the buffer.
+
+        :return: The message, or None if more data needs to be received.
+        """
+        start = self.__start
+        end = self.__end
+        if start == end:
+            return None
+
+        buf = self.__buffer
+        if self.__framing is None:
+            # MSG-LEN of the octet-counting framing starts with a non-zero digit
+            self.__framing = (
+                SyslogStreamReader.FRAMING_OCTET_COUNTING
+                if 0x31 <= buf[start] <= 0x39 else
+                SyslogStreamReader.FRAMING_NON_TRANSPARENT
+            )
+
+        if self.__framing == SyslogStreamReader.FRAMING_OCTET_COUNTING:
+            sp = buf.find(b' ', start, min(end, start + SyslogStreamReader.MAX_LENGTH_DIGITS + 1))
+            if sp < 0:
+                if end - start > SyslogStreamReader.MAX_LENGTH_DIGITS:
+                    raise RuntimeError('Invalid syslog payload')
+                return None
+
+            digits = bytes(self.__view[start:sp])
+            if not digits.isdigit():
+                raise RuntimeError('Invalid syslog payload')
+
+            length = int(digits)
+            if length > self.__max_message_size:
+                raise RuntimeError(f'Too large syslog message - {length} bytes')
+
+            msg_start = sp + 1
+            msg_end = msg_start + length
+            if msg_end > end:
+                self.__reserve(msg_end - start)
+                return None
+
+            self.__start = msg_end
+            return self.__decode(msg_start, msg_end)
+        else:
+            lf = buf.find(b'\n', start, end)
+            if lf < 0:
+                if end - start >= self.__max_message_size:
+                    raise RuntimeError(f'Too large syslog message - over {self.__max_message_size} bytes')
+                return None
+
+            self.__start = lf + 1
+            return self.__decode(start, lf)
+
+    def read(
+        self
+    ) -> Iterator[str]:
+        """Read syslog messages until the connection is closed.
+
+        :return: The iterator of the messages.
+        """
+        while True:
+            if (log := self.__next_message()) is not None:
+                yield log
+            elif not self.__fill():
+                break
+
+        if self.__start < self.__end:
+            if self.__framing == SyslogStreamReader.FRAMING_NON_TRANSPARENT:
+                # The last message without the trailer
+                yield self.__decode(self.__start, self.__end)
+            else:
+                raise IncompleteReadError(bytes(self.__view[self.__start:self.__end]), None)
+            self.__start = self.__end
 
 
 class UdpLogForwardingHandler(BaseRequestHandler):
@@ -628,9 +2181,10 @@ class UdpLogForwardingHandler(BaseRequestHandler):
     def handle(
         self
     ) -> None:
-        log, s = self.request
+        data, s = self.request
         try:
-            if log := log.decode(errors='ignore').rstrip('\r\n'):
+            self.__log_forwarder.count_received('udp', {self.client_address[0]: 1}, len(data))
+            if log := data.decode(errors='ignore').rstrip('\r\n'):
                 self.__log_forwarder.send_log(log)
         except Exception:
             traceback.print_exc()
@@ -662,70 +2216,444 @@ class TcpLogForwardingHandler(BaseRequestHandler):
     def handle(
         self
     ) -> None:
+        reader = SyslogStreamReader(self.request)
+        nmessages = nbytes = 0
         try:
-            ss = self.request
-            while True:
-                # Read payload length
-                length = None
-                for c in iter(functools.partial(ss.recv, 1), b''):
-                    if c.isdigit():
-                        length = ((length or 0) * 10) + int(c)
-                    elif c == b' ' and length is not None:
-                        break
-                    else:
-                        raise RuntimeError('Invalid syslog payload')
-                else:
-                    if length is None:
-                        return
-                    raise RuntimeError('Invalid syslog payload')
-
-                # Read syslog payload
-                log = bytearray(length)
-                view = memoryview(log)
-                pos = 0
-                while pos < length:
-                    n = ss.recv_into(view[pos:])
-                    if not n:
-                        raise IncompleteReadError(log, length)
-                    pos += n
-
-                if log := log.decode(errors='ignore').rstrip('\r\n'):
+            for log in reader.read():
+                if log:
                     self.__log_forwarder.send_log(log)
 
+                # Count in the metrics at intervals not to contend for the lock on every message
+                if reader.nmessages - nmessages >= METRICS_COUNT_INTERVAL:
+                    self.__log_forwarder.count_received(
+                        'tcp', {self.client_address[0]: reader.nmessages - nmessages}, reader.nbytes - nbytes
+                    )
+                    nmessages, nbytes = reader.nmessages, reader.nbytes
+
         except Exception:
             traceback.print_exc()
         finally:
+            self.__log_forwarder.count_received(
+                'tcp', {self.client_address[0]: reader.nmessages - nmessages}, reader.nbytes - nbytes
+            )
             self.request.close()
             self.__log_forwarder.flush()
 
 
+class AsyncUdpLogReceiver:
+    """ Log Receiver (UDP) running on an asyncio event loop
+    """
+    def __init__(
+        self,
+        log_forwarder: LogForwarder,
+        port: int,
+        recv_buffer_size: int = DEFAULT_UDP_RECV_BUFFER_SIZE,
+        batch_size: int = DEFAULT_UDP_RECV_BATCH_SIZE,
+        reuse_port: bool = False,
+    ) -> None:
+        """Initialize this instance.
+
+        :param log_forwarder: The log forwarder to which received logs are fed.
+        :param port: The port number to receive syslog messages.
+        :param recv_buffer_size: The socket receive buffer size (SO_RCVBUF) in bytes.
+        :param batch_size: The maximum number of datagrams to read at once.
+        :param reuse_port: Set to True to bind the port with SO_REUSEPORT; otherwise, False.
+        """
+        self.__log_forwarder = log_forwarder
+        self.__port = port
+        self.__recv_buffer_size = recv_buffer_size
+        self.__batch_size = batch_size
+        self.__reuse_port = reuse_port
+        self.__rxq_ovfl = False
+        self.__ndatagrams = 0
+        self.__nbytes = 0
+        self.__nbatches = 0
+        self.__ndropped = 0
+        if metrics := log_forwarder.metrics:
+            metrics.add_collector(
+                lambda m: m.set('syslog_to_hec_udp_dropped_datagrams_total', self.__ndropped)
+            )
+
+    @property
+    def statistics(
+        self
+    ) -> dict[str, int]:
+        """The receive statistics.
+
+        `dropped` is the number of datagrams dropped by the kernel because the
+        socket receive buffer was full. It's always 0 where SO_RXQ_OVFL is unavailable.
+        """
+        return {
+            'received': self.__ndatagrams,
+            'bytes': self.__nbytes,
+            'batches': self.__nbatches,
+            'dropped': self.__ndropped,
+        }
+
+    def __open_socket(
+        self
+    ) -> socket.socket:
+        """Open a non-blocking UDP socket bound to the syslog port.
+
+        :return: The socket.
+        """
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if self.__reuse_port:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.__recv_buffer_size)
+            except OSError:
+                traceback.print_exc()
+
+            rcvbuf = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+            if rcvbuf < self.__recv_buffer_size:
+                print(f'* SO_RCVBUF is limited to {rcvbuf} bytes by the system (requested {self.__recv_buffer_size}).')
+
+            if SO_RXQ_OVFL is not None and hasattr(sock, 'recvmsg'):
+                try:
+                    sock.setsockopt(socket.SOL_SOCKET, SO_RXQ_OVFL, 1)
+                    self.__rxq_ovfl = True
+                except OSError:
+                    self.__rxq_ovfl = False
+
+            sock.bind(('', self.__port))
+            sock.setblocking(False)
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+    def __read_datagrams(
+        self,
+        sock: socket.socket,
+    ) -> list[tuple[bytes, tuple[str, int]]]:
+        """Read datagrams available on the socket without blocking.
+
+        :param sock: The socket to read.
+        :return: The datagrams read and their source addresses.
+        """
+        datagrams = []
+        ancbufsize = socket.CMSG_SPACE(4) if self.__rxq_ovfl else 0
+        for _ in range(self.__batch_size):
+            try:
+                if self.__rxq_ovfl:
+                    data, ancdata, _, address = sock.recvmsg(UDP_MAX_DATAGRAM_SIZE, ancbufsize)
+                    for level, ctype, cdata in ancdata:
+                        if level == socket.SOL_SOCKET and ctype == SO_RXQ_OVFL and len(cdata) >= 4:
+                            # The counter is cumulative for the socket
+                            self.__ndropped = struct.unpack('=I', cdata[:4])[0]
+                else:
+                    data, address = sock.recvfrom(UDP_MAX_DATAGRAM_SIZE)
+            except (BlockingIOError, InterruptedError):
+                break
+            datagrams.append((data, address))
+        return datagrams
+
+    def __on_readable(
+        self,
+        sock: socket.socket,
+    ) -> None:
+        """Drain the socket and feed the logs to the log forwarder.
+
+        :param sock: The socket ready to read.
+        """
+        try:
+            if not (datagrams := self.__read_datagrams(sock)):
+                return
+
+            nbytes = sum(len(data) for data, _ in datagrams)
+            self.__nbatches += 1
+            self.__ndatagrams += len(datagrams)
+            self.__nbytes += nbytes
+
+            if self.__log_forwarder.metrics:
+                self.__log_forwarder.count_received(
+                    'udp', collections.Counter(address[0] for _, address in datagrams), nbytes
+                )
+
+            logs = [
+                log for log in (
+                    data.decode(errors='ignore').rstrip('\r\n') for data, _ in datagrams
+                ) if log
+            ]
+            if logs:
+                self.__log_forwarder.send_logs(logs)
+        except Exception:
+            traceback.print_exc()
+
+    async def serve_forever(
+        self
+    ) -> None:
+        """Receive syslog messages until cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        sock = self.__open_socket()
+        try:
+            loop.add_reader(sock.fileno(), self.__on_readable, sock)
+            try:
+                ndropped = 0
+                while True:
+                    await asyncio.sleep(DEFAULT_STATS_INTERVAL)
+                    if self.__ndropped != ndropped:
+                        print(
+                            f'* {self.__ndropped - ndropped} datagrams have been dropped by the kernel. '
+                            'Consider increasing --udp_recv_buffer_size.'
+                        )
+                        ndropped = self.__ndropped
+            finally:
+                loop.remove_reader(sock.fileno())
+        finally:
+            sock.close()
+            print(f'* UDP receiver statistics: {json.dumps(self.statistics)}')
+
+
+def run_server(
+    settings: Settings,
+    log_forwarder: LogForwarder,
+    reuse_port: bool = False,
+) -> None:
+    """Receive syslog messages and forward them until interrupted.
+
+    :param settings: The settings.
+    :param log_forwarder: The log forwarder.
+    :param reuse_port: Set to True to bind the port with SO_REUSEPORT; otherwise, False.
+    """
+    if settings.syslog_protocol == 'udp' and settings.engine == 'asyncio':
+        receiver = AsyncUdpLogReceiver(
+            log_forwarder=log_forwarder,
+            port=settings.syslog_port,
+            recv_buffer_size=settings.udp_recv_buffer_size,
+            batch_size=settings.udp_recv_batch_size,
+            reuse_port=reuse_port
+        )
+        loop = asyncio.SelectorEventLoop()
+        try:
+            loop.run_until_complete(receiver.serve_forever())
+        finally:
+            loop.close()
+        return
+
+    if settings.syslog_protocol == 'udp':
+        server_class, handler_class = ThreadingUDPServer, UdpLogForwardingHandler
+    elif settings.syslog_protocol == 'tcp':
+        server_class, handler_class = ThreadingTCPServer, TcpLogForwardingHandler
+    else:
+        raise ValueError(f'Invalid syslog protocol - {settings.syslog_protocol}')
+
+    server_class.allow_reuse_address = True
+    with server_class(('', settings.syslog_port), handler_class, bind_and_activate=False) as server:
+        if reuse_port:
+            server.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        server.server_bind()
+        server.server_activate()
+        server.timeout = settings.socket_timeout
+        server.log_forwarder = log_forwarder
+        server.serve_forever()
+
+
+def run_worker(
+    settings: Settings,
+    worker_id: int,
+    stats_queue: multiprocessing.Queue,
+) -> None:
+    """Run a worker process sharing the syslog port with the other workers.
+
+    :param settings: The settings.
+    :param worker_id: The worker ID.
+    :param stats_queue: The queue to report the statistics to the supervisor.
+    """
+    # Make sure that the buffered logs are flushed when the supervisor stops the worker
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    metrics = new_metrics() if settings.metrics_port else None
+    log_forwarder = LogForwarder(settings, worker_id=worker_id, metrics=metrics)
+
+    def report() -> None:
+        stats_queue.put((worker_id, log_forwarder.statistics, metrics and metrics.snapshot()))
+
+    def report_periodically() -> None:
+        while True:
+            time.sleep(METRICS_REPORT_INTERVAL if metrics else DEFAULT_STATS_INTERVAL)
+            report()
+
+    threading.Thread(target=report_periodically, args=(), daemon=True).start()
+    try:
+        run_server(settings, log_forwarder, reuse_port=True)
+    finally:
+        log_forwarder.finish()
+        report()
+
+
+class WorkerSupervisor:
+    """ Supervisor of the worker processes
+    """
+    def __init__(
+        self,
+        settings: Settings,
+    ) -> None:
+        """Initialize this instance.
+
+        :param settings: The settings.
+        """
+        if not hasattr(socket, 'SO_REUSEPORT') or 'fork' not in multiprocessing.get_all_start_methods():
+            raise ValueError('--workers is not supported on this platform')
+
+        self.__settings = settings
+        self.__context = multiprocessing.get_context('fork')
+        self.__stats_queue = self.__context.Queue()
+        self.__workers: dict[int, multiprocessing.Process] = {}
+        self.__statistics: dict[int, dict[str, Any]] = {}
+        self.__metrics = new_metrics() if settings.metrics_port else None
+        self.__metrics_snapshots: dict[int, dict[tuple[str, tuple[tuple[str, str], ...]], Any]] = {}
+        self.__metrics_lock = threading.Lock()
+
+    @staticmethod
+    def __merge(
+        x: dict[str, Any],
+        y: dict[str, Any],
+    ) -> dict[str, Any]:
+        """Combine two statistics, summing up the counters and taking the max of the gauges.
+
+        :param x: The statistics.
+        :param y: The statistics to be added.
+        :return: The statistics combined.
+        """
+        z = dict(x)
+        for k, v in y.items():
+            if isinstance(v, dict):
+                z[k] = WorkerSupervisor.__merge(z.get(k) or {}, v)
+            elif isinstance(v, (int, float)):
+                z[k] = max(z.get(k, v), v) if k in STATS_GAUGES else z.get(k, 0) + v
+            else:
+                z[k] = v
+        return z
+
+    @property
+    def statistics(
+        self
+    ) -> dict[str, Any]:
+        """The statistics combined across the workers.
+
+        The counters are summed up, and the gauges (STATS_GAUGES) are the max of the workers.
+        """
+        stats = {}
+        for worker_stats in self.__statistics.values():
+            stats = WorkerSupervisor.__merge(stats, worker_stats)
+        return stats
+
+    def __start_worker(
+        self,
+        worker_id: int,
+    ) -> None:
+        worker = self.__context.Process(
+            target=run_worker,
+            args=(self.__settings, worker_id, self.__stats_queue),
+            daemon=False
+        )
+        worker.start()
+        self.__workers[worker_id] = worker
+
+    def __collect_statistics(
+        self,
+        timeout: float,
+    ) -> None:
+        try:
+            report = self.__stats_queue.get(timeout=timeout)
+            while True:
+                worker_id, stats, snapshot = report
+                self.__statistics[worker_id] = stats
+                if snapshot is not None:
+                    with self.__metrics_lock:
+                        self.__metrics_snapshots[worker_id] = snapshot
+                report = self.__stats_queue.get_nowait()
+        except queue.Empty:
+            pass
+
+    def __render_metrics(
+        self
+    ) -> str:
+        """Render the metrics summed up across the workers.
+
+        :return: The metrics in the Prometheus text format.
+        """
+        with self.__metrics_lock:
+            snapshots = list(self.__metrics_snapshots.values())
+        return self.__metrics.render(self.__metrics.merge(snapshots))
+
+    def run(
+        self
+    ) -> None:
+        """Start the workers and restart them if they die, until interrupted.
+        """
+        for worker_id in range(self.__settings.workers):
+            self.__start_worker(worker_id)
+
+        if self.__metrics:
+            metrics_server = MetricsServer(self.__settings.metrics_port, self.__render_metrics)
+            metrics_server.start()
+        else:
+            metrics_server = None
+
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        try:
+            next_report = time.monotonic() + DEFAULT_STATS_INTERVAL
+            while True:
+                self.__collect_statistics(timeout=1)
+
+                for worker_id, worker in list(self.__workers.items()):
+                    if not worker.is_alive():
+                        print(f'* Worker {worker_id} exited with code {worker.exitcode}, restarting ...')
+                        worker.join()
+                        self.__start_worker(worker_id)
+
+                if time.monotonic() >= next_report:
+                    next_report = time.monotonic() + DEFAULT_STATS_INTERVAL
+                    print(f'* Combined statistics of {len(self.__workers)} workers: {json.dumps(self.statistics)}')
+        finally:
+            for worker in self.__workers.values():
+                if worker.is_alive():
+                    worker.terminate()
+            # Keep draining the queue while joining: a worker does not exit
+            # until the parent reads the statistics it has already put.
+            for worker in self.__workers.values():
+                while worker.is_alive():
+                    self.__collect_statistics(timeout=0)
+                    worker.join(timeout=0.1)
+                worker.join()
+            self.__collect_statistics(timeout=0)
+            print(f'* Combined statistics of {len(self.__workers)} workers: {json.dumps(self.statistics)}')
+            if metrics_server:
+                metrics_server.stop()
+
+
 def main(
 ) -> None:
     """
     Main
     """
     settings = Settings()
-    log_forwarder = LogForwarder(settings)
-    try:
-        print(f'Starting the syslog_to_hec server on port {settings.syslog_port} ...')
-
-        if settings.syslog_protocol == 'udp':
-            ThreadingUDPServer.allow_reuse_address = True
-            with ThreadingUDPServer(('', settings.syslog_port), UdpLogForwardingHandler) as server:
-                server.timeout = settings.socket_timeout
-                server.log_forwarder = log_forwarder
-                server.serve_forever()
-
-        elif settings.syslog_protocol == 'tcp':
-            ThreadingTCPServer.allow_reuse_address = True
-            with ThreadingTCPServer(('', settings.syslog_port), TcpLogForwardingHandler) as server:
-                server.timeout = settings.socket_timeout
-                server.log_forwarder = log_forwarder
-                server.serve_forever()
+    print(f'Starting the syslog_to_hec server on port {settings.syslog_port} ...')
+
+    if settings.workers > 1:
+        WorkerSupervisor(settings).run()
+    else:
+        metrics = new_metrics() if settings.metrics_port else None
+        log_forwarder = LogForwarder(settings, metrics=metrics)
+        if metrics:
+            metrics_server = MetricsServer(settings.metrics_port, metrics.render)
+            metrics_server.start()
         else:
-            raise ValueError(f'Invalid syslog protocol - {settings.syslog_protocol}')
-    finally:
-        log_forwarder.finish()
+            metrics_server = None
+
+        try:
+            run_server(settings, log_forwarder)
+        finally:
+            log_forwarder.finish()
+            if metrics_server:
+                metrics_server.stop()
 
 
 if __name__ in ('__main__', '__builtin__', 'builtins'):